@@ -0,0 +1,77 @@
+"""Compares the IVF-flat index against the exact similarity search.
+
+Reports recall@k (the share of the exact top-k that the approximate search also returns) and the mean
+query latency of both searches for several n_probe values.
+
+Usage (from the backend directory):
+    python benchmarks/ann_recall.py                      # uses the stored entity embeddings
+    python benchmarks/ann_recall.py --synthetic 200000   # clustered random vectors of the same dimension
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+# Make the backend's src package and config importable however the script is started.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.similarity import EmbeddingIndex
+from src.ann import IVFFlatIndex
+from src.utils import load_embeddings
+
+
+def synthetic_index(count: int, dimension: int, clusters: int, seed: int) -> EmbeddingIndex:
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dimension)).astype(np.float32)
+    vectors = centers[rng.integers(clusters, size=count)] + 0.5 * rng.standard_normal((count, dimension)).astype(np.float32)
+    return EmbeddingIndex([f"entity-{i}" for i in range(count)], vectors)
+
+
+def mean_latency_ms(search, entities) -> float:
+    start = time.perf_counter()
+    for entity in entities:
+        search(entity)
+    return (time.perf_counter() - start) * 1000 / len(entities)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--synthetic", type=int, help="Benchmark on this many synthetic vectors instead.")
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--k", type=int, default=15)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--n-lists", type=int, default=None)
+    parser.add_argument("--n-probe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        index = synthetic_index(args.synthetic, args.dimension, max(8, args.synthetic // 500), args.seed)
+    else:
+        index = load_embeddings()
+        if index is None:
+            parser.error("No stored embeddings found; run the backend once or use --synthetic.")
+
+    start = time.perf_counter()
+    ivf = IVFFlatIndex.build(index, args.n_lists, seed=args.seed)
+    print(f"{len(index)} vectors, {ivf.n_lists} lists, built in {time.perf_counter() - start:.2f}s")
+
+    rng = np.random.default_rng(args.seed)
+    entities = list(index.ids[rng.choice(len(index), min(args.queries, len(index)), replace=False)])
+    exact = {entity: {e for e, _ in index.search(entity, args.k)} for entity in entities}
+    exact_ms = mean_latency_ms(lambda entity: index.search(entity, args.k), entities)
+
+    print(f"{'search':>12} {'recall@' + str(args.k):>10} {'ms/query':>10}")
+    print(f"{'exact':>12} {1.0:>10.3f} {exact_ms:>10.3f}")
+    for n_probe in args.n_probe:
+        found = 0
+        for entity in entities:
+            found += len(exact[entity] & {e for e, _ in ivf.search(entity, args.k, n_probe)})
+        recall = found / sum(len(neighbours) for neighbours in exact.values())
+        ms = mean_latency_ms(lambda entity: ivf.search(entity, args.k, n_probe), entities)
+        print(f"{'n_probe=' + str(n_probe):>12} {recall:>10.3f} {ms:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Compares the sentence-transformers (PyTorch) and ONNX encoders on the dataset's triple texts.
+
+Each encoder runs in its own process, so the reported load time includes its imports and the peak RSS is
+its own. Embeddings are checked against the first encoder's (PyTorch by default): the script exits with
+status 1 if any cosine similarity falls below --tolerance.
+
+Usage (from the backend directory, after python export_onnx_model.py --quantize):
+    python benchmarks/encoders.py --sentences 5000
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+
+# Make the backend's src package and config importable however the script is started.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import SPARQL_BACKEND, SPARQL_ENDPOINT, ONTOLOGY_PATH, LOCAL_SPARQL_ENGINE, ONNX_MODEL_DIR
+
+
+async def fetch_triple_texts(limit: int) -> list:
+    from src import SPARQLClient
+    from src.queries import create_all_triples_query
+    from src.utils import triple_text
+
+    if SPARQL_BACKEND == "local":
+        client = SPARQLClient.from_ontology(ONTOLOGY_PATH, LOCAL_SPARQL_ENGINE)
+    else:
+        client = SPARQLClient(SPARQL_ENDPOINT)
+    try:
+        return [triple_text(binding) for binding in await client.query(create_all_triples_query())][:limit]
+    finally:
+        await client.aclose()
+
+
+def encode_in_child(args):
+    """Child process: loads one encoder, encodes the texts and writes the embeddings and timings."""
+    start = time.perf_counter()
+    from src.encoding import encode_texts, load_encoder
+    from src.utils import EMBEDDING_MODEL
+
+    encoder, quantized = args.child.split(":") if ":" in args.child else (args.child, "")
+    model = load_encoder(encoder, EMBEDDING_MODEL, args.onnx_model_dir, quantized == "quantized")
+    load_seconds = time.perf_counter() - start
+    with open(os.path.join(args.workdir, "texts.json"), encoding="utf-8") as f:
+        texts = json.load(f)
+    embeddings, stats = encode_texts(model, texts, args.batch_size)
+    np.save(os.path.join(args.workdir, f"{args.child.replace(':', '-')}.npy"), embeddings)
+    print(json.dumps({"loadSeconds": load_seconds, **stats}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sentences", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--encoders", nargs="+", default=["torch", "onnx", "onnx:quantized"])
+    parser.add_argument("--onnx-model-dir", default=ONNX_MODEL_DIR)
+    parser.add_argument("--tolerance", type=float, default=0.99, help="Minimum cosine similarity to the first encoder.")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return encode_in_child(args)
+
+    texts = asyncio.run(fetch_triple_texts(args.sentences))
+    with tempfile.TemporaryDirectory() as workdir:
+        with open(os.path.join(workdir, "texts.json"), "w", encoding="utf-8") as f:
+            json.dump(texts, f)
+
+        print(f"{len(texts)} triple texts, batch size {args.batch_size}")
+        print(f"{'encoder':>16} {'load s':>8} {'sentences/s':>12} {'peak RSS MB':>12} {'min cos':>8} {'mean cos':>9}")
+        reference = None
+        failed = False
+        for encoder in args.encoders:
+            command = [sys.executable, __file__, "--child", encoder, "--workdir", workdir]
+            command += ["--batch-size", str(args.batch_size), "--onnx-model-dir", args.onnx_model_dir]
+            child = subprocess.Popen(
+                command,
+                stdout=subprocess.PIPE,
+                text=True,
+            )
+            output = child.stdout.read()
+            _, status, usage = os.wait4(child.pid, 0)
+            if status != 0:
+                print(f"{encoder:>16} failed")
+                failed = True
+                continue
+            stats = json.loads(output.strip().splitlines()[-1])
+            embeddings = np.load(os.path.join(workdir, f"{encoder.replace(':', '-')}.npy"))
+            if reference is None:
+                reference = embeddings
+            if embeddings.shape != reference.shape:
+                print(f"{encoder:>16} produced {embeddings.shape} embeddings instead of {reference.shape}")
+                failed = True
+                continue
+            cosines = np.sum(embeddings * reference, axis=1)
+            failed |= bool(cosines.min() < args.tolerance)
+            # ru_maxrss is in kilobytes on Linux.
+            print(
+                f"{encoder:>16} {stats['loadSeconds']:>8.2f} {stats['sentencesPerSecond']:>12.1f} "
+                f"{usage.ru_maxrss / 1024:>12.1f} {cosines.min():>8.4f} {cosines.mean():>9.4f}"
+            )
+    if failed:
+        print(f"Some encoders failed or differ from the first encoder's embeddings by more than {args.tolerance}.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
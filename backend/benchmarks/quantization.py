@@ -0,0 +1,62 @@
+"""Compares quantized (float16, int8) similarity search against the full-precision search.
+
+Reports the memory of each representation, the top-k agreement (the share of the float32 top-k that the
+quantized search also returns) with and without float32 re-ranking, and the mean query latency.
+
+Usage (from the backend directory):
+    python benchmarks/quantization.py                      # uses the stored entity embeddings
+    python benchmarks/quantization.py --synthetic 200000   # clustered random vectors of the same dimension
+"""
+import argparse
+import os
+import sys
+import numpy as np
+
+# Make the backend's src package and config importable however the script is started.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.ann_recall import synthetic_index, mean_latency_ms
+from src.quantization import QuantizedIndex, QUANTIZED_DTYPES
+from src.utils import load_embeddings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--synthetic", type=int, help="Benchmark on this many synthetic vectors instead.")
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--k", type=int, default=15)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--rerank", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        index = synthetic_index(args.synthetic, args.dimension, max(8, args.synthetic // 500), args.seed)
+    else:
+        index = load_embeddings()
+        if index is None:
+            parser.error("No stored embeddings found; run the backend once or use --synthetic.")
+
+    rng = np.random.default_rng(args.seed)
+    entities = list(index.ids[rng.choice(len(index), min(args.queries, len(index)), replace=False)])
+    exact = {entity: {e for e, _ in index.search(entity, args.k)} for entity in entities}
+    exact_ms = mean_latency_ms(lambda entity: index.search(entity, args.k), entities)
+    full_bytes = index.matrix.nbytes
+
+    print(f"{len(index)} vectors of dimension {index.matrix.shape[1]}")
+    print(f"{'search':>16} {'MB':>8} {'saved':>7} {'top-' + str(args.k):>8} {'ms/query':>10}")
+    print(f"{'float32':>16} {full_bytes / 2**20:>8.2f} {0.0:>7.1%} {1.0:>8.3f} {exact_ms:>10.3f}")
+    for dtype in QUANTIZED_DTYPES:
+        quantized = QuantizedIndex.build(index, dtype)
+        saved = 1 - quantized.memory_bytes() / full_bytes
+        for rerank in args.rerank:
+            quantized.rerank = rerank
+            found = sum(len(exact[entity] & {e for e, _ in quantized.search(entity, args.k)}) for entity in entities)
+            agreement = found / sum(len(neighbours) for neighbours in exact.values())
+            ms = mean_latency_ms(lambda entity: quantized.search(entity, args.k), entities)
+            label = f"{dtype} x{rerank}" if rerank > 1 else dtype
+            print(f"{label:>16} {quantized.memory_bytes() / 2**20:>8.2f} {saved:>7.1%} {agreement:>8.3f} {ms:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
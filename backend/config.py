@@ -1 +1,65 @@
-DATE_FORMAT = '%d/%m/%Y'
\ No newline at end of file
+import os
+
+DATE_FORMAT = '%d/%m/%Y'
+
+# "http" queries a remote SPARQL endpoint, "local" loads the ontology into memory at startup.
+SPARQL_BACKEND = os.getenv("SPARQL_BACKEND", "http")
+# Change to "http://localhost:3030/Esolangs/sparql" if not using Docker or http://host.docker.internal:3030/Esolangs/sparql if using Docker
+SPARQL_ENDPOINT = os.getenv("SPARQL_ENDPOINT", "https://fuseki-728286732053.us-central1.run.app/Esolangs/query")
+# Maximum number of pooled keep-alive connections to the SPARQL endpoint.
+SPARQL_POOL_SIZE = int(os.getenv("SPARQL_POOL_SIZE", "20"))
+# Default per-request timeout in seconds for SPARQL queries.
+SPARQL_TIMEOUT = float(os.getenv("SPARQL_TIMEOUT", "30"))
+# Timeout in seconds for the bulk query that loads every esolang's details into the catalogue.
+CATALOGUE_TIMEOUT = float(os.getenv("CATALOGUE_TIMEOUT", "300"))
+# Output of scrapers/ontology/create_ontology.py, used when SPARQL_BACKEND is "local".
+ONTOLOGY_PATH = os.getenv("ONTOLOGY_PATH", "data/esolangs-ontology.rdf")
+# In-process engine for the "local" backend: "oxigraph" or "rdflib". Empty picks Oxigraph when installed.
+LOCAL_SPARQL_ENGINE = os.getenv("LOCAL_SPARQL_ENGINE") or None
+# Version of the data served by a remote endpoint; bump it (or call the reload endpoint) after loading a new ontology.
+DATASET_VERSION = os.getenv("DATASET_VERSION", "1")
+# Bounds and lifetime (in seconds) of the cached facet and list query results.
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "256"))
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "3600"))
+# Admin endpoints require this value in the X-Admin-Token header; they are disabled when it is unset.
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+# Maximum number of esolangs that can be requested from the batch details endpoint at once.
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "100"))
+# Number of IVF lists scanned by similarity searches; 0 uses the exact search. Can be overridden per request.
+ANN_N_PROBE = int(os.getenv("ANN_N_PROBE", "0"))
+# Number of IVF lists (k-means centroids); empty uses the square root of the number of embeddings.
+ANN_N_LISTS = int(os.getenv("ANN_N_LISTS")) if os.getenv("ANN_N_LISTS") else None
+# Number of neighbours precomputed per esolang for the similar-esolangs lookup table.
+NEIGHBOURS_K = int(os.getenv("NEIGHBOURS_K", "50"))
+# Start building the embeddings in the background at startup when none are stored.
+BUILD_EMBEDDINGS_ON_STARTUP = os.getenv("BUILD_EMBEDDINGS_ON_STARTUP", "true").lower() == "true"
+# Seconds clients are told to wait (Retry-After) while the embeddings are being built.
+EMBEDDING_RETRY_AFTER = int(os.getenv("EMBEDDING_RETRY_AFTER", "30"))
+# Sentences per encoder batch when computing triple embeddings.
+ENCODE_BATCH_SIZE = int(os.getenv("ENCODE_BATCH_SIZE", "64"))
+# Number of CPU worker processes the triple list is sharded across while encoding; 1 encodes in-process.
+ENCODE_PROCESSES = int(os.getenv("ENCODE_PROCESSES", "1"))
+# Search a float16 or int8 copy of the embeddings ("float16", "int8"); empty searches the float32 embeddings.
+EMBEDDING_QUANTIZATION = os.getenv("EMBEDDING_QUANTIZATION") or None
+# Candidates per requested neighbour rescored in full precision after a quantized search; 1 disables re-ranking.
+QUANTIZED_RERANK = int(os.getenv("QUANTIZED_RERANK", "4"))
+# Sentence encoder used to compute embeddings: "torch" (sentence-transformers) or "onnx".
+EMBEDDING_ENCODER = os.getenv("EMBEDDING_ENCODER", "torch")
+# Directory of the ONNX export of the embedding model, written by export_onnx_model.py.
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", "models/all-MiniLM-L6-v2-onnx")
+# Run the dynamically int8-quantized ONNX model instead of the float32 one.
+ONNX_QUANTIZED = os.getenv("ONNX_QUANTIZED", "false").lower() == "true"
+# Maximum number of esolangs on one page of the paginated search endpoint.
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "500"))
+# Seconds browsers and CDNs may reuse a read-only response before revalidating it with its ETag.
+HTTP_CACHE_MAX_AGE = int(os.getenv("HTTP_CACHE_MAX_AGE", "60"))
+# Seconds a query sent to the raw SPARQL endpoint may run before it is abandoned with a 504.
+RAW_QUERY_TIMEOUT = float(os.getenv("RAW_QUERY_TIMEOUT", "10"))
+# Maximum number of rows the raw SPARQL endpoint returns; larger results are truncated.
+RAW_QUERY_MAX_ROWS = int(os.getenv("RAW_QUERY_MAX_ROWS", "1000"))
+# Worker threads reserved for raw SPARQL queries; when all are busy, further raw queries get a 503.
+RAW_QUERY_WORKERS = int(os.getenv("RAW_QUERY_WORKERS", "2"))
+# Raw query results kept in their own cache, apart from the application's query results.
+RAW_QUERY_CACHE_SIZE = int(os.getenv("RAW_QUERY_CACHE_SIZE", "64"))
+# Total number of rows the raw query cache may hold.
+RAW_QUERY_CACHE_ROWS = int(os.getenv("RAW_QUERY_CACHE_ROWS", "50000"))
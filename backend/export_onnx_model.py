@@ -0,0 +1,63 @@
+"""Exports the embedding model to ONNX for the CPU encoder (EMBEDDING_ENCODER=onnx).
+
+Writes model.onnx, tokenizer.json and, with --quantize, a dynamically int8-quantized model_quantized.onnx.
+Needs sentence-transformers (and torch) only for the export itself. Run from the backend directory:
+    python export_onnx_model.py --quantize
+"""
+import argparse
+import os
+import torch
+from sentence_transformers import SentenceTransformer
+from config import ONNX_MODEL_DIR
+from src.utils import EMBEDDING_MODEL
+
+
+class TokenEmbeddings(torch.nn.Module):
+    """The transformer of the sentence-transformers model, returning only the token embeddings."""
+
+    def __init__(self, transformer):
+        super().__init__()
+        self.transformer = transformer
+
+    def forward(self, input_ids, attention_mask, token_type_ids):
+        return self.transformer(
+            input_ids=input_ids, attention_mask=attention_mask, token_type_ids=token_type_ids
+        ).last_hidden_state
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=EMBEDDING_MODEL)
+    parser.add_argument("--output", default=ONNX_MODEL_DIR)
+    parser.add_argument("--quantize", action="store_true", help="Also write a dynamically int8-quantized model.")
+    parser.add_argument("--opset", type=int, default=14)
+    args = parser.parse_args()
+
+    os.makedirs(args.output, exist_ok=True)
+    model = SentenceTransformer(args.model, device="cpu")
+    model.tokenizer.backend_tokenizer.save(os.path.join(args.output, "tokenizer.json"))
+
+    sample = model.tokenizer(["an esoteric language"], return_tensors="pt")
+    inputs = ("input_ids", "attention_mask", "token_type_ids")
+    model_path = os.path.join(args.output, "model.onnx")
+    torch.onnx.export(
+        TokenEmbeddings(model[0].auto_model).eval(),
+        tuple(sample[name] for name in inputs),
+        model_path,
+        input_names=list(inputs),
+        output_names=["last_hidden_state"],
+        dynamic_axes={name: {0: "batch", 1: "sequence"} for name in (*inputs, "last_hidden_state")},
+        opset_version=args.opset,
+    )
+    print(f"Exported {args.model} to {model_path}")
+
+    if args.quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantized_path = os.path.join(args.output, "model_quantized.onnx")
+        quantize_dynamic(model_path, quantized_path, weight_type=QuantType.QInt8)
+        print(f"Quantized model written to {quantized_path}")
+
+
+if __name__ == "__main__":
+    main()
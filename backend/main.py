@@ -1,16 +1,202 @@
 from typing import List, Dict, Optional
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Header, Depends, Request, Response
 from src import SPARQLClient
+from src.SPARQLClient import QuerySyntaxError, QueryCapacityError
 from src import *
 from src.utils import *
 import urllib.parse
+import asyncio
+import math
+import secrets
+import time
+import httpx
 import logging
-from sklearn.metrics.pairwise import cosine_similarity
 from fastapi.middleware.cors import CORSMiddleware
+from pydantic import BaseModel
+from config import (
+    SPARQL_BACKEND, SPARQL_ENDPOINT, SPARQL_POOL_SIZE, SPARQL_TIMEOUT, CATALOGUE_TIMEOUT, ONTOLOGY_PATH,
+    LOCAL_SPARQL_ENGINE, DATASET_VERSION, QUERY_CACHE_SIZE, QUERY_CACHE_TTL, ADMIN_TOKEN, MAX_BATCH_SIZE,
+    ANN_N_PROBE, ANN_N_LISTS, NEIGHBOURS_K, BUILD_EMBEDDINGS_ON_STARTUP, EMBEDDING_RETRY_AFTER,
+    ENCODE_BATCH_SIZE, ENCODE_PROCESSES, MAX_PAGE_SIZE, HTTP_CACHE_MAX_AGE, EMBEDDING_QUANTIZATION, QUANTIZED_RERANK,
+    EMBEDDING_ENCODER, ONNX_MODEL_DIR, ONNX_QUANTIZED, RAW_QUERY_TIMEOUT, RAW_QUERY_MAX_ROWS,
+    RAW_QUERY_WORKERS, RAW_QUERY_CACHE_SIZE, RAW_QUERY_CACHE_ROWS,
+)
+from src.cache import QueryCache
+from src.similarity import EmbeddingIndex
+from src.ann import IVFFlatIndex
+from src.neighbours import NeighbourTable
+from src.quantization import QuantizedIndex
+from src.embedding_store import StaleEmbeddingStoreError
+from src.embedding_job import EmbeddingJob
+from src.catalogue import Catalogue, encode_cursor, decode_cursor
+from src.http_cache import dataset_etag, encoded_etag, etag_matches, Payload, PayloadStore, FAST_JSON_RESPONSE
+from src.autocomplete import AUTOCOMPLETE_MAX_RESULTS
+from src.guarded_query import guard_select_query, RejectedQueryError
+from contextlib import asynccontextmanager
 
 logging.basicConfig(level=logging.DEBUG, format="%(asctime)s - %(levelname)s - %(message)s")
 
-app = FastAPI()
+query_cache = QueryCache(max_size=QUERY_CACHE_SIZE, ttl=QUERY_CACHE_TTL)
+raw_query_cache = QueryCache(max_size=RAW_QUERY_CACHE_SIZE, ttl=QUERY_CACHE_TTL, max_rows=RAW_QUERY_CACHE_ROWS)
+
+if SPARQL_BACKEND == "local":
+    sparql_client = SPARQLClient.from_ontology(
+        ONTOLOGY_PATH,
+        LOCAL_SPARQL_ENGINE,
+        cache=query_cache,
+        raw_cache=raw_query_cache,
+        raw_workers=RAW_QUERY_WORKERS,
+        timeout=SPARQL_TIMEOUT,
+    )
+else:
+    sparql_client = SPARQLClient(
+        SPARQL_ENDPOINT,
+        pool_size=SPARQL_POOL_SIZE,
+        timeout=SPARQL_TIMEOUT,
+        dataset_version=DATASET_VERSION,
+        cache=query_cache,
+        raw_cache=raw_query_cache,
+        raw_workers=RAW_QUERY_WORKERS,
+    )
+
+
+catalogue: Optional[Catalogue] = None
+catalogue_lock = asyncio.Lock()
+
+
+async def get_catalogue() -> Optional[Catalogue]:
+    """Returns the in-process catalogue of the current dataset version, (re)building it when the version changed.
+
+    Returns None if it cannot be built, so callers can fall back to querying the SPARQL endpoint.
+    """
+    global catalogue
+    version = sparql_client.dataset_version
+    if catalogue is not None and catalogue.version == version:
+        return catalogue
+    async with catalogue_lock:
+        if catalogue is None or catalogue.version != version:
+            try:
+                names, details = await asyncio.gather(
+                    sparql_client.query(ESOLANGS_NAME_LIST_QUERY, cached=True),
+                    sparql_client.query(create_all_esolangs_details_query(), timeout=CATALOGUE_TIMEOUT),
+                )
+                catalogue = await asyncio.to_thread(Catalogue.from_query_results, names, details, version)
+                logging.info(f"Catalogue built with {len(catalogue)} esolangs for dataset version {version}")
+            except Exception as e:
+                logging.error(f"Error building the catalogue: {e}", exc_info=True)
+                return None
+    return catalogue
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await get_catalogue()
+    if open_embedding_index() is None and BUILD_EMBEDDINGS_ON_STARTUP:
+        embedding_job.start(build_embedding_artifacts)
+    yield
+    await sparql_client.aclose()
+
+
+app = FastAPI(lifespan=lifespan)
+
+# Read-only routes whose responses only change with the dataset; they are served with ETags.
+DATASET_ROUTES = (
+    "/api/esolangs",
+    "/api/facets",
+    "/api/facet-counts",
+    "/api/year-created",
+    "/api/category",
+    "/api/paradigm",
+    "/api/computational-class",
+    "/api/memory-system",
+    "/api/dimension",
+    "/api/type-system",
+    "/api/dialect",
+    "/api/file-extension",
+)
+# Excluded: similar esolangs change when the embeddings are rebuilt, not with the dataset version.
+NON_DATASET_ROUTES = ("/api/esolangs/similar/",)
+
+
+# Parameterless list routes hit on every page load; their bodies are served from hot_payloads.
+HOT_ROUTES = {
+    "/api/esolangs",
+    "/api/facets",
+    "/api/year-created",
+    "/api/category",
+    "/api/paradigm",
+    "/api/computational-class",
+    "/api/memory-system",
+    "/api/dimension",
+    "/api/type-system",
+    "/api/dialect",
+    "/api/file-extension",
+}
+hot_payloads = PayloadStore()
+
+
+def is_hot_request(request: Request) -> bool:
+    return request.method == "GET" and request.url.path in HOT_ROUTES and not request.url.query
+
+
+def is_dataset_route(path: str) -> bool:
+    if path.startswith(NON_DATASET_ROUTES):
+        return False
+    return any(path == route or path.startswith(f"{route}/") for route in DATASET_ROUTES)
+
+
+@app.middleware("http")
+async def serve_hot_payloads(request: Request, call_next):
+    """Serves hot routes from bodies serialized and compressed once per dataset version, picking the
+    variant by Accept-Encoding; the route itself only runs to fill the store."""
+    if not is_hot_request(request):
+        return await call_next(request)
+    path = request.url.path
+
+    version = sparql_client.dataset_version
+    payload = hot_payloads.get(path, version)
+    if payload is None:
+        response = await call_next(request)
+        if response.status_code != 200 or sparql_client.dataset_version != version:
+            return response
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        payload = await asyncio.to_thread(Payload, body, response.media_type or "application/json")
+        hot_payloads.put(path, version, payload)
+
+    encoding, body = payload.select(request.headers.get("accept-encoding"))
+    headers = {"Vary": "Accept-Encoding"}
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(body, media_type=payload.media_type, headers=headers)
+
+
+@app.middleware("http")
+async def conditional_get(request: Request, call_next):
+    """Adds dataset-version ETags and Cache-Control to read-only routes and answers matching If-None-Match
+    requests with 304 before the route runs.
+
+    Compressed bodies get the ETag with a content-coding suffix; a 304 repeats the ETag the client sent.
+    """
+    if request.method not in ("GET", "HEAD") or not is_dataset_route(request.url.path):
+        return await call_next(request)
+
+    version = sparql_client.dataset_version
+    etag = dataset_etag(version, request.url.path, request.url.query)
+    headers = {"Cache-Control": f"public, max-age={HTTP_CACHE_MAX_AGE}, must-revalidate"}
+    matched = etag_matches(request.headers.get("if-none-match"), etag)
+    if matched:
+        headers["ETag"] = matched
+        if is_hot_request(request):
+            headers["Vary"] = "Accept-Encoding"
+        return Response(status_code=304, headers=headers)
+
+    response = await call_next(request)
+    # A reload during the request may have produced a body of the next version: leave it untagged.
+    if response.status_code == 200 and sparql_client.dataset_version == version:
+        headers["ETag"] = encoded_etag(etag, response.headers.get("content-encoding"))
+        response.headers.update(headers)
+    return response
+
 
 app.add_middleware(
     CORSMiddleware,
@@ -18,15 +204,22 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Result-Truncated", "X-Row-Limit"],
 )
 
-sparql_client = SPARQLClient("https://fuseki-728286732053.us-central1.run.app/Esolangs/query") # Change to "http://localhost:3030/Esolangs/sparql" if not using Docker or http://host.docker.internal:3030/Esolangs/sparql if using Docker
 
-@app.get("/api/esolangs", response_model=List[str])
-def get_esolangs():
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Rejects admin requests without the configured token; admin endpoints are disabled when none is set."""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled.")
+    if x_admin_token is None or not secrets.compare_digest(x_admin_token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Forbidden.")
+
+@app.get("/api/esolangs", response_model=List[str], response_class=FAST_JSON_RESPONSE)
+async def get_esolangs():
     """Fetch all esolangs from the SPARQL endpoint."""
     try:
-        result = sparql_client.query(ESOLANGS_NAME_LIST_QUERY)
+        result = await sparql_client.query(ESOLANGS_NAME_LIST_QUERY, cached=True)
         if not result:
             logging.info("No esolangs found.")
             raise HTTPException(status_code=404, detail="No esolangs found.")
@@ -41,17 +234,34 @@ def get_esolangs():
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# Declared before /api/esolangs/{esolang_name}, which would otherwise match it.
+@app.get("/api/esolangs/autocomplete", response_model=List[str])
+async def autocomplete_esolangs(prefix: str, limit: int = Query(10, ge=1, le=AUTOCOMPLETE_MAX_RESULTS)):
+    """Suggest esolangs whose name or alias starts with the prefix, most connected first."""
+    try:
+        current = await get_catalogue()
+        if current is None:
+            raise HTTPException(status_code=503, detail="Suggestions are not available.")
+        return current.autocomplete.suggest(prefix, limit)
+    except HTTPException as e:
+        logging.error(f"Error fetching suggestions: {e.detail}", exc_info=True)
+        raise e
+    except Exception as e:
+        logging.error(f"Error fetching suggestions: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.get("/api/esolangs/{esolang_name}", response_model=Dict)
 async def get_esolang(esolang_name: str):
     """Fetch details of a specific esolang from the SPARQL endpoint."""
     try:
         encoded_esolang_name = urllib.parse.quote(esolang_name)
-        result = sparql_client.query(create_esolang_name_query(encoded_esolang_name))
+        result = await sparql_client.query(create_esolang_details_query(encoded_esolang_name))
         if not result:
             logging.info(f"No data found for esolang: {esolang_name}")
             raise HTTPException(status_code=404, detail="No data found.")
 
-        return get_esolang_from_query_result(esolang_name, result)
+        return get_esolang_from_property_rows(esolang_name, result)
     except HTTPException as e:
         logging.error(f"Error fetching esolang: {e.detail}", exc_info=True)
         raise e
@@ -60,6 +270,39 @@ async def get_esolang(esolang_name: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+class EsolangBatchRequest(BaseModel):
+    names: List[str]
+
+
+@app.post("/api/esolangs/batch", response_model=Dict)
+async def get_esolangs_batch(request: EsolangBatchRequest):
+    """Fetch details of several esolangs in a single SPARQL query; unknown names are reported as missing."""
+    names = list(dict.fromkeys(request.names))
+    if len(names) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_SIZE} esolangs can be requested at once.")
+    if not names:
+        return {"esolangs": [], "missing": []}
+
+    try:
+        encoded_names = [urllib.parse.quote(name) for name in names]
+        result = await sparql_client.query(create_esolangs_details_query(encoded_names))
+        rows_by_esolang = group_rows_by_esolang(result)
+
+        esolangs = []
+        missing = []
+        for name, encoded_name in zip(names, encoded_names):
+            rows = rows_by_esolang.get(f"{BASE_URI}{encoded_name}")
+            if rows:
+                esolangs.append(get_esolang_from_property_rows(name, rows))
+            else:
+                missing.append(name)
+
+        return {"esolangs": esolangs, "missing": missing}
+    except Exception as e:
+        logging.error(f"Error fetching esolangs batch: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.get("/api/esolangs/search/", response_model=List[str])
 async def search_esolangs(
     search_term: str = None,
@@ -75,8 +318,30 @@ async def search_esolangs(
     limit: Optional[int] = Query(None),
     offset: Optional[int] = Query(None),
 ):
-    """Search for esolangs based on a search term and various filters."""
+    """Search for esolangs based on a search term and various filters.
+
+    Answered from the in-process catalogue: filters through its facet bitmaps and the search term through
+    the full-text index, with results ordered by relevance (by name without a search term). Falls back to a
+    SPARQL query when the catalogue is unavailable.
+    """
     try:
+        current = await get_catalogue()
+        if current is not None:
+            rows = current.select(
+                search_term,
+                search_filters(
+                    paradigm, category, year_created, memory_system, dimension, computational_class,
+                    file_extension, type_system, dialect,
+                ),
+            )
+            esolangs = [current.esolangs[row]["name"] for row in rows]
+            esolangs = esolangs[offset or 0:]
+            esolangs = esolangs[:limit] if limit is not None else esolangs
+            if not esolangs:
+                logging.info(f"No data found")
+                raise HTTPException(status_code=404, detail="No data found")
+            return esolangs
+
         query = create_esolang_search_query(
             search_term,
             year_created,
@@ -93,7 +358,7 @@ async def search_esolangs(
         )
         logging.info(f"Query: {query}")
 
-        result = sparql_client.query(query)
+        result = await sparql_client.query(query)
         if not result:
             logging.info(f"No data found")
             raise HTTPException(status_code=404, detail="No data found")
@@ -109,11 +374,109 @@ async def search_esolangs(
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
-@app.get("/api/year-created", response_model=List[str])
+def search_filters(
+    paradigm: List[str] = Query(None),
+    category: List[str] = Query(None),
+    year_created: List[str] = Query(None),
+    memory_system: List[str] = Query(None),
+    dimension: List[str] = Query(None),
+    computational_class: List[str] = Query(None),
+    file_extension: List[str] = Query(None),
+    type_system: List[str] = Query(None),
+    dialect: List[str] = Query(None),
+) -> Dict[str, Optional[List[str]]]:
+    """The facet filters of a search request, keyed by parameter name."""
+    return {
+        "paradigm": paradigm,
+        "category": category,
+        "year_created": year_created,
+        "memory_system": memory_system,
+        "dimension": dimension,
+        "computational_class": computational_class,
+        "file_extension": file_extension,
+        "type_system": type_system,
+        "dialect": dialect,
+    }
+
+
+@app.get("/api/esolangs/search/page", response_model=Dict)
+async def search_esolangs_page(
+    search_term: str = None,
+    filters: Dict = Depends(search_filters),
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+):
+    """Search like /api/esolangs/search/, one page at a time.
+
+    Pass the returned nextCursor to get the following page; it is null on the last page. Results are ordered
+    by relevance (then name) with a search term and by name without one, and total counts all matches.
+    """
+    try:
+        current = await get_catalogue()
+        if current is None:
+            raise HTTPException(status_code=503, detail="Search index is not available.")
+        try:
+            after = decode_cursor(cursor, bool(search_term)) if cursor else None
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        esolangs, total, next_key = current.page(search_term, filters, after, limit)
+        return {
+            "esolangs": esolangs,
+            "total": total,
+            "nextCursor": encode_cursor(next_key) if next_key else None,
+        }
+    except HTTPException as e:
+        logging.error(f"Error during search: {e.detail}", exc_info=True)
+        raise e
+    except Exception as e:
+        logging.error(f"Unexpected error during search: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+@app.get("/api/facet-counts", response_model=Dict)
+async def get_facet_counts(search_term: str = None, filters: Dict = Depends(search_filters)):
+    """Count, for every facet value, how many esolangs matching the search term and filters carry it."""
+    try:
+        current = await get_catalogue()
+        if current is None:
+            raise HTTPException(status_code=503, detail="Facet counts are not available.")
+        rows = current.select(search_term, filters)
+        return {"total": len(rows), "facets": current.facets.counts(rows)}
+    except HTTPException as e:
+        logging.error(f"Error counting facets: {e.detail}", exc_info=True)
+        raise e
+    except Exception as e:
+        logging.error(f"Error counting facets: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/facets", response_model=Dict, response_class=FAST_JSON_RESPONSE)
+async def get_facets():
+    """Fetch the values of every facet at once, with the dataset version they belong to.
+
+    Answered from the in-process catalogue, or with a single UNION query when it is unavailable.
+    """
+    try:
+        current = await get_catalogue()
+        if current is not None:
+            return {"datasetVersion": current.version, "facets": current.facets.value_lists()}
+
+        version = sparql_client.dataset_version
+        result = await sparql_client.query(create_all_facets_query(), cached=True)
+        facets = {facet: [] for facet in FACET_PROPERTIES}
+        for row in result:
+            facets[row["facet"]["value"]].append(row["value"]["value"])
+        return {"datasetVersion": version, "facets": facets}
+    except Exception as e:
+        logging.error(f"Error fetching facets: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/year-created", response_model=List[str], response_class=FAST_JSON_RESPONSE)
 async def get_years_created():
     """Fetch all unique years an esolang was created from the SPARQL endpoint."""
     try:
-        result = sparql_client.query(create_years_created_query())
+        result = await sparql_client.query(create_years_created_query(), cached=True)
         if not result:
             raise HTTPException(status_code=404, detail="No data found.")
         years = [year["yearCreated"]["value"] for year in result]
@@ -126,11 +489,11 @@ async def get_years_created():
         logging.error(f"Error fetching years created: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/category", response_model=List[str])
+@app.get("/api/category", response_model=List[str], response_class=FAST_JSON_RESPONSE)
 async def get_categories():
     """Fetch all unique categories from the SPARQL endpoint."""
     try:
-        result = sparql_client.query(create_categories_query())
+        result = await sparql_client.query(create_categories_query(), cached=True)
         if not result:
             raise HTTPException(status_code=404, detail="No data found.")
         categories = [category["name"]["value"] for category in result]
@@ -144,11 +507,11 @@ async def get_categories():
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.get("/api/paradigm", response_model=List[str])
+@app.get("/api/paradigm", response_model=List[str], response_class=FAST_JSON_RESPONSE)
 async def get_paradigms():
     """Fetch all unique paradigms from the SPARQL endpoint."""
     try:
-        result = sparql_client.query(create_paradigms_query())
+        result = await sparql_client.query(create_paradigms_query(), cached=True)
         if not result:
             raise HTTPException(status_code=404, detail="No data found.")
         paradigms = [paradigm["name"]["value"] for paradigm in result]
@@ -162,11 +525,11 @@ async def get_paradigms():
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.get("/api/computational-class", response_model=List[str])
+@app.get("/api/computational-class", response_model=List[str], response_class=FAST_JSON_RESPONSE)
 async def get_computational_classes():
     """Fetch all unique computational classes from the SPARQL endpoint."""
     try:
-        result = sparql_client.query(create_computational_classes_query())
+        result = await sparql_client.query(create_computational_classes_query(), cached=True)
         if not result:
             raise HTTPException(status_code=404, detail="No data found.")
         classes = [class_["name"]["value"] for class_ in result]
@@ -180,11 +543,11 @@ async def get_computational_classes():
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.get("/api/memory-system", response_model=List[str])
+@app.get("/api/memory-system", response_model=List[str], response_class=FAST_JSON_RESPONSE)
 async def get_memory_systems():
     """Fetch all unique memory systems from the SPARQL endpoint."""
     try:
-        result = sparql_client.query(create_memory_systems_query())
+        result = await sparql_client.query(create_memory_systems_query(), cached=True)
         if not result:
             raise HTTPException(status_code=404, detail="No data found.")
         systems = [system["name"]["value"] for system in result]
@@ -198,11 +561,11 @@ async def get_memory_systems():
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.get("/api/dimension", response_model=List[str])
+@app.get("/api/dimension", response_model=List[str], response_class=FAST_JSON_RESPONSE)
 async def get_dimensions():
     """Fetch all unique dimensions from the SPARQL endpoint."""
     try:
-        result = sparql_client.query(create_dimensions_query())
+        result = await sparql_client.query(create_dimensions_query(), cached=True)
         if not result:
             raise HTTPException(status_code=404, detail="No data found.")
         dimensions = [dimension["name"]["value"] for dimension in result]
@@ -216,11 +579,11 @@ async def get_dimensions():
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.get("/api/type-system", response_model=List[str])
+@app.get("/api/type-system", response_model=List[str], response_class=FAST_JSON_RESPONSE)
 async def get_type_systems():
     """Fetch all unique type systems from the SPARQL endpoint."""
     try:
-        result = sparql_client.query(create_type_systems_query())
+        result = await sparql_client.query(create_type_systems_query(), cached=True)
         if not result:
             raise HTTPException(status_code=404, detail="No data found.")
         systems = [system["name"]["value"] for system in result]
@@ -234,11 +597,11 @@ async def get_type_systems():
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.get("/api/dialect", response_model=List[str])
+@app.get("/api/dialect", response_model=List[str], response_class=FAST_JSON_RESPONSE)
 async def get_dialects():
     """Fetch all unique dialects from the SPARQL endpoint."""
     try:
-        result = sparql_client.query(create_dialects_query())
+        result = await sparql_client.query(create_dialects_query(), cached=True)
         if not result:
             raise HTTPException(status_code=404, detail="No data found.")
         dialects = [dialect["name"]["value"] for dialect in result]
@@ -252,11 +615,11 @@ async def get_dialects():
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.get("/api/file-extension", response_model=List[str])
+@app.get("/api/file-extension", response_model=List[str], response_class=FAST_JSON_RESPONSE)
 async def get_file_extensions():
     """Fetch all unique file extensions from the SPARQL endpoint."""
     try:
-        result = sparql_client.query(create_file_extensions_query())
+        result = await sparql_client.query(create_file_extensions_query(), cached=True)
         if not result:
             raise HTTPException(status_code=404, detail="No data found.")
         extensions = [extension["fileExtension"]["value"] for extension in result]
@@ -271,15 +634,41 @@ async def get_file_extensions():
 
 
 @app.get("/api/sparsql-data", response_model=List[dict])
-async def get_sparql_data(query: str):
-    """Endpoint to query the SPARQL endpoint with a user-provided query."""
+async def get_sparql_data(query: str, response: Response):
+    """Endpoint to query the SPARQL endpoint with a user-provided query.
+
+    Only SELECT queries run, on RAW_QUERY_WORKERS dedicated workers (503 when all are busy); they are cut
+    off after RAW_QUERY_TIMEOUT seconds and their results are cached by normalized query text, apart from
+    the application's own query results. At most RAW_QUERY_MAX_ROWS rows are returned: the Server-Timing
+    header reports the execution time and X-Result-Truncated whether rows were left out.
+    """
     try:
-        result = sparql_client.query(query)
+        try:
+            guarded_query = guard_select_query(query, RAW_QUERY_MAX_ROWS)
+        except RejectedQueryError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        start = time.perf_counter()
+        try:
+            result = await sparql_client.query_raw(guarded_query, timeout=RAW_QUERY_TIMEOUT)
+        except QueryCapacityError as e:
+            retry_after = str(math.ceil(RAW_QUERY_TIMEOUT))
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": retry_after})
+        except (asyncio.TimeoutError, httpx.TimeoutException):
+            raise HTTPException(status_code=504, detail=f"Query exceeded the {RAW_QUERY_TIMEOUT:g} s time limit.")
+        except QuerySyntaxError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid query: {e}")
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        truncated = len(result) > RAW_QUERY_MAX_ROWS
+        response.headers["Server-Timing"] = f"sparql;dur={elapsed_ms:.1f}"
+        response.headers["X-Result-Truncated"] = "true" if truncated else "false"
+        response.headers["X-Row-Limit"] = str(RAW_QUERY_MAX_ROWS)
         if not result:
             logging.info("No data found.")
             raise HTTPException(status_code=404, detail="No data found.")
 
-        return result
+        return result[:RAW_QUERY_MAX_ROWS]
     except HTTPException as e:
         logging.error(f"Error fetching SPARQL data: {e.detail}", exc_info=True)
         raise e
@@ -288,33 +677,155 @@ async def get_sparql_data(query: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+embedding_index: Optional[EmbeddingIndex] = None
+ann_index: Optional[IVFFlatIndex] = None
+quantized_index: Optional[QuantizedIndex] = None
+neighbour_table: Optional[NeighbourTable] = None
+embedding_job = EmbeddingJob(EMBEDDINGS_LOCK_PATH)
+
+
+def swap_embedding_artifacts(
+    index: EmbeddingIndex,
+    table: Optional[NeighbourTable],
+    ann: Optional[IVFFlatIndex],
+    quantized: Optional[QuantizedIndex] = None,
+):
+    """Publishes a new set of embedding artifacts at once; requests already running keep the ones they hold."""
+    global embedding_index, neighbour_table, ann_index, quantized_index
+    embedding_index, neighbour_table, ann_index, quantized_index = index, table, ann, quantized
+
+
+def open_quantized_index(index: EmbeddingIndex) -> Optional[QuantizedIndex]:
+    """Returns the configured quantized copy of the embeddings, loading it from disk or building and saving it once."""
+    if EMBEDDING_QUANTIZATION is None:
+        return None
+    path = QUANTIZED_INDEX_PATH.format(dtype=EMBEDDING_QUANTIZATION)
+    quantized = QuantizedIndex.load(path, index, QUANTIZED_RERANK)
+    if quantized is None:
+        quantized = QuantizedIndex.build(index, EMBEDDING_QUANTIZATION, QUANTIZED_RERANK)
+        quantized.save(path)
+        logging.info(
+            f"Quantized {len(index)} embeddings to {quantized.dtype}: {quantized.memory_bytes()} bytes "
+            f"instead of {index.matrix.nbytes}"
+        )
+    return quantized
+
+
+def open_embedding_index() -> Optional[EmbeddingIndex]:
+    """Opens the stored embeddings with their neighbour table, IVF index and quantized copy; a stale store is
+    treated as missing.
+
+    Only loads from disk: an IVF index or quantized copy that is missing is built by a background job, and
+    searches fall back to the exact index meanwhile.
+    """
+    try:
+        index = load_embeddings()
+    except StaleEmbeddingStoreError as e:
+        logging.warning(f"Ignoring stale embedding store: {e}")
+        return None
+    if index is not None:
+        ann = IVFFlatIndex.load(IVF_INDEX_PATH, index)
+        quantized = None
+        if EMBEDDING_QUANTIZATION is not None:
+            path = QUANTIZED_INDEX_PATH.format(dtype=EMBEDDING_QUANTIZATION)
+            quantized = QuantizedIndex.load(path, index, QUANTIZED_RERANK)
+        swap_embedding_artifacts(index, NeighbourTable.load(NEIGHBOURS_PATH, index.fingerprint()), ann, quantized)
+        if ann is None or (EMBEDDING_QUANTIZATION is not None and quantized is None):
+            embedding_job.start(build_search_artifacts)
+    return index
+
+
+async def build_embedding_artifacts(report) -> Dict:
+    """Computes the embeddings, neighbour table and IVF index from the current dataset and swaps them in."""
+    report("fetching triples", 0.0)
+    triples = await sparql_client.query(create_all_triples_query())
+    index, stats = await asyncio.to_thread(
+        compute_embeddings,
+        triples,
+        report,
+        batch_size=ENCODE_BATCH_SIZE,
+        processes=ENCODE_PROCESSES,
+        encoder=EMBEDDING_ENCODER,
+        onnx_model_dir=ONNX_MODEL_DIR,
+        onnx_quantized=ONNX_QUANTIZED,
+    )
+
+    report("precomputing neighbours", 0.97)
+    table = await asyncio.to_thread(NeighbourTable.build, index, get_esolang_iris(triples), NEIGHBOURS_K)
+    await asyncio.to_thread(table.save, NEIGHBOURS_PATH)
+
+    report("building IVF index", 0.99)
+    ann = await asyncio.to_thread(IVFFlatIndex.build, index, ANN_N_LISTS)
+    await asyncio.to_thread(ann.save, IVF_INDEX_PATH)
+    quantized = await asyncio.to_thread(open_quantized_index, index)
+
+    swap_embedding_artifacts(index, table, ann, quantized)
+    return stats
+
+
+async def build_search_artifacts(report) -> Dict:
+    """Builds the IVF index and quantized copy the current embeddings are missing, without re-encoding them."""
+    index, table, ann, quantized = embedding_index, neighbour_table, ann_index, quantized_index
+    if ann is None:
+        report("building IVF index", 0.0)
+        ann = await asyncio.to_thread(IVFFlatIndex.build, index, ANN_N_LISTS)
+        await asyncio.to_thread(ann.save, IVF_INDEX_PATH)
+    if quantized is None and EMBEDDING_QUANTIZATION is not None:
+        report("quantizing embeddings", 0.5)
+        quantized = await asyncio.to_thread(open_quantized_index, index)
+    if embedding_index is index:
+        swap_embedding_artifacts(index, table, ann, quantized)
+    return {"entities": len(index)}
+
+
 @app.get("/api/esolangs/similar/{esolang_name}", response_model=List[str])
-async def get_similar_esolangs(esolang_name: str):
-    """Fetch similar esolangs based on the given esolang name."""
+async def get_similar_esolangs(
+    esolang_name: str,
+    k: int = Query(15, ge=1, le=100),
+    min_score: Optional[float] = Query(None, ge=-1.0, le=1.0),
+    n_probe: Optional[int] = Query(None, ge=0),
+):
+    """Fetch similar esolangs based on the given esolang name.
+
+    Esolangs in the precomputed neighbour table are answered from it unless n_probe is given: n_probe > 0
+    then searches the approximate IVF index scanning that many lists (higher is slower but more accurate)
+    and n_probe = 0 searches exactly.
+    """
     try:
-        embeddings = load_embeddings()
-        if embeddings is None:
-            triples = sparql_client.query(create_all_triples_query())
-            embeddings = compute_embeddings(triples)
+        live_search = n_probe is not None
+        if n_probe is None:
+            n_probe = ANN_N_PROBE
+
+        index, table, ann, quantized = embedding_index, neighbour_table, ann_index, quantized_index
+        if index is None and not embedding_job.running:
+            index = open_embedding_index()
+            table, ann, quantized = neighbour_table, ann_index, quantized_index
+        if index is None:
+            # After a failed build, retries are left to the admin rebuild endpoint.
+            if embedding_job.state == "failed":
+                raise HTTPException(status_code=503, detail="Embeddings are not available: the last build failed.")
+            embedding_job.start(build_embedding_artifacts)
+            raise HTTPException(
+                status_code=503,
+                detail="Embeddings are being built, try again later.",
+                headers={"Retry-After": str(EMBEDDING_RETRY_AFTER)},
+            )
 
         esolang_url = f"{BASE_URI}{urllib.parse.quote(esolang_name)}"
-        given_language_embedding = embeddings.get(esolang_url)
-        if given_language_embedding is None:
+        similar_languages = table.lookup(esolang_url, k, min_score) if table and not live_search else None
+        if similar_languages is None:
+            # Not in the precomputed table (or more neighbours requested than it holds), or n_probe given:
+            # search live, exactly while the IVF index is still being built.
+            if n_probe > 0 and ann is not None:
+                similar_languages = ann.search(esolang_url, k, n_probe, min_score)
+            else:
+                similar_languages = (quantized or index).search(esolang_url, k, min_score)
+        if similar_languages is None:
             logging.info(f"Embedding not found for {esolang_name}")
             raise HTTPException(status_code=404, detail="Embedding not found.")
-        print("Given language embedding: ", given_language_embedding)
-
-        similarities = {
-            entity: cosine_similarity([given_language_embedding], [embedding])[0][0]
-            for entity, embedding in embeddings.items()
-            if entity != esolang_url
-        }
-        similarities = {entity: float(score) for entity, score in similarities.items()}
-        similar_languages = sorted(similarities.items(), key=lambda x: x[1], reverse=True)[:15]
 
         if not similar_languages:
             raise HTTPException(status_code=404, detail="No similar esolangs found")
-        print("Similar languages: ", similar_languages)
 
         return [entity.replace(BASE_URI, "") for entity, _ in similar_languages]
     except HTTPException as e:
@@ -323,3 +834,63 @@ async def get_similar_esolangs(esolang_name: str):
     except Exception as e:
         logging.error(f"Error fetching similar esolangs: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/cache", response_model=Dict)
+async def get_cache_stats():
+    """Report hit/miss counters and size of the query result cache and coalesced query counts."""
+    return sparql_client.stats()
+
+
+@app.get("/api/esolangs/search/text", response_model=List[Dict])
+async def search_esolangs_text(q: str, limit: int = Query(20, ge=1, le=100)):
+    """Full-text search over esolang names, aliases, designers and descriptions, ranked by relevance.
+
+    Every result carries its score and the matching fields with the matches wrapped in <mark> tags.
+    """
+    try:
+        current = await get_catalogue()
+        if current is None:
+            raise HTTPException(status_code=503, detail="Search index is not available.")
+        return [
+            {
+                "name": current.esolangs[doc]["name"],
+                "score": round(score, 4),
+                "highlights": current.text_index.highlight(doc, q),
+            }
+            for doc, score in current.text_index.search(q, limit)
+        ]
+    except HTTPException as e:
+        logging.error(f"Error during text search: {e.detail}", exc_info=True)
+        raise e
+    except Exception as e:
+        logging.error(f"Unexpected error during text search: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+@app.post("/api/admin/dataset/reload", response_model=Dict, dependencies=[Depends(require_admin)])
+async def reload_dataset(version: Optional[str] = None):
+    """Reload the dataset (or record a new remote dataset version) and invalidate cached results."""
+    try:
+        dataset_version = await sparql_client.reload(version)
+        logging.info(f"Dataset reloaded, version {dataset_version}")
+        return {"datasetVersion": dataset_version}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logging.error(f"Error reloading dataset: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/api/admin/embeddings/rebuild", response_model=Dict, status_code=202, dependencies=[Depends(require_admin)])
+async def rebuild_embeddings():
+    """Start rebuilding the embeddings in the background; the current ones keep serving until it finishes."""
+    if not embedding_job.start(build_embedding_artifacts):
+        raise HTTPException(status_code=409, detail="An embedding build is already running.")
+    return embedding_job.status()
+
+
+@app.get("/api/admin/embeddings/status", response_model=Dict, dependencies=[Depends(require_admin)])
+async def get_embedding_build_status():
+    """Report the state and progress of the embedding build."""
+    return embedding_job.status()
@@ -0,0 +1,46 @@
+"""Materializes the top-k similar entities of every EsotericLanguage into the neighbour table.
+
+Run after the embeddings have been (re)computed, from the backend directory:
+    python precompute_neighbours.py --k 50
+"""
+import argparse
+import asyncio
+import time
+from config import SPARQL_BACKEND, SPARQL_ENDPOINT, ONTOLOGY_PATH, LOCAL_SPARQL_ENGINE
+from src import SPARQLClient
+from src.queries import BASE_URI, ESOLANGS_NAME_LIST_QUERY
+from src.neighbours import NeighbourTable
+from src.utils import load_embeddings, NEIGHBOURS_PATH
+
+
+async def fetch_esolang_iris() -> list:
+    if SPARQL_BACKEND == "local":
+        client = SPARQLClient.from_ontology(ONTOLOGY_PATH, LOCAL_SPARQL_ENGINE)
+    else:
+        client = SPARQLClient(SPARQL_ENDPOINT)
+    try:
+        result = await client.query(ESOLANGS_NAME_LIST_QUERY)
+        return [f"{BASE_URI}{esolang['name']['value']}" for esolang in result]
+    finally:
+        await client.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--k", type=int, default=50, help="Number of neighbours stored per esolang.")
+    parser.add_argument("--output", default=NEIGHBOURS_PATH)
+    args = parser.parse_args()
+
+    index = load_embeddings()
+    if index is None:
+        parser.error("No stored embeddings found; compute them first.")
+    esolangs = asyncio.run(fetch_esolang_iris())
+
+    start = time.perf_counter()
+    table = NeighbourTable.build(index, esolangs, args.k)
+    table.save(args.output)
+    print(f"Stored top-{table.k} neighbours of {len(table)} esolangs in {args.output} ({time.perf_counter() - start:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
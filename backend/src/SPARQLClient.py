@@ -1,14 +1,390 @@
-from SPARQLWrapper import SPARQLWrapper, JSON
-from typing import List, Dict
+from typing import List, Dict, Optional
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import hashlib
+import re
+import threading
+import httpx
+import rdflib
+from rdflib.plugins.sparql import prepareQuery
+from .cache import QueryCache
+from .singleflight import SingleFlight
+
+try:
+    import pyoxigraph
+except ImportError:
+    pyoxigraph = None
+
+try:
+    import h2
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+XSD_STRING = "http://www.w3.org/2001/XMLSchema#string"
+
+# String literals and IRIs are matched first so whitespace and "#" inside them are left untouched; outside
+# them, comments count as whitespace.
+QUERY_TOKEN_PATTERN = re.compile(
+    r'("""(?:[^"\\]|\\.|"(?!""))*"""|\'\'\'(?:[^\'\\]|\\.|\'(?!\'\'))*\'\'\''
+    r'|"(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\'|<[^<>\s]*>)|(?:\s|#[^\n]*)+'
+)
+
+
+class QuerySyntaxError(ValueError):
+    """Raised when the engine rejects a query as malformed (a parse error or an HTTP 400 from the endpoint)."""
+
+
+class QueryCapacityError(RuntimeError):
+    """Raised when every worker for ad-hoc queries is busy."""
+
+
+class IsolatedPool:
+    """A few workers reserved for ad-hoc user queries, kept apart from the ones the application's own queries use.
+
+    A query that timed out on a local engine cannot be cancelled, so its worker stays busy until the query
+    finishes. Queries are admitted only while a worker is free, otherwise QueryCapacityError is raised
+    instead of queueing behind runaway queries.
+    """
+
+    def __init__(self, workers: int = 2):
+        self.workers = workers
+        self.busy = 0
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix="sparql-isolated")
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            if self.busy >= self.workers:
+                raise QueryCapacityError("Every worker for ad-hoc queries is busy.")
+            self.busy += 1
+
+    def release(self):
+        with self._lock:
+            self.busy -= 1
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class HTTPBackend:
+    """Sends queries to a remote SPARQL endpoint (e.g. Fuseki) over a pool of keep-alive connections.
+
+    HTTP/2 is negotiated when the h2 package is installed, so concurrent queries are multiplexed
+    over the pooled connections instead of each waiting for a free socket.
+    """
+
+    def __init__(self, endpoint: str, pool_size: int = 20, timeout: float = 30.0, version: str = "1"):
+        self.endpoint = endpoint
+        self.version = version
+        self.client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            timeout=timeout,
+            headers={"Accept": "application/sparql-results+json"},
+        )
+
+    async def query(self, query: str, timeout: Optional[float] = None) -> List[Dict]:
+        response = await self.client.post(
+            self.endpoint,
+            data={"query": query},
+            timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT,
+        )
+        if response.status_code == 400:
+            raise QuerySyntaxError(response.text)
+        response.raise_for_status()
+        return response.json()["results"]["bindings"]
+
+    async def query_isolated(self, query: str, timeout: Optional[float], pool: IsolatedPool) -> List[Dict]:
+        """Runs a query holding one of the pool's slots; the request is cancelled on timeout, freeing it."""
+        pool.acquire()
+        try:
+            return await self.query(query, timeout)
+        finally:
+            pool.release()
+
+    async def reload(self, version: Optional[str] = None):
+        """The remote store is reloaded out of band, so only the recorded version changes."""
+        if version is None:
+            raise ValueError("A dataset version is required when reloading a remote endpoint.")
+        self.version = version
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+class LocalBackend:
+    """Base class for in-process backends; queries run in a worker thread to keep the event loop free.
+
+    The dataset version is a content hash of the ontology file, so it changes whenever the file does.
+    Queries given no timeout of their own are limited to the backend's default timeout (None: no limit).
+    """
+
+    def __init__(self, ontology_path: str, timeout: Optional[float] = None):
+        self.ontology_path = ontology_path
+        self.timeout = timeout
+        self.version = None
+        self.load()
+
+    def load(self):
+        """Loads the ontology file, replacing the current data only once parsing has succeeded."""
+        version = ontology_version(self.ontology_path)
+        self.load_data()
+        self.version = version
+
+    def load_data(self):
+        raise NotImplementedError
+
+    def execute(self, query: str) -> List[Dict]:
+        raise NotImplementedError
+
+    async def query(self, query: str, timeout: Optional[float] = None) -> List[Dict]:
+        timeout = timeout if timeout is not None else self.timeout
+        return await asyncio.wait_for(asyncio.to_thread(self.execute, query), timeout)
+
+    async def query_isolated(self, query: str, timeout: Optional[float], pool: IsolatedPool) -> List[Dict]:
+        """Runs a query on one of the pool's workers; the worker stays taken until the query finishes, even after
+        a timeout."""
+        pool.acquire()
+        try:
+            future = pool.executor.submit(self.execute, query)
+        except Exception:
+            pool.release()
+            raise
+        future.add_done_callback(lambda _: pool.release())
+        return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+
+    async def reload(self, version: Optional[str] = None):
+        await asyncio.to_thread(self.load)
+
+    async def aclose(self):
+        pass
+
+
+class RDFLibBackend(LocalBackend):
+    """Answers queries from an in-memory rdflib graph of the ontology.
+
+    rdflib's query parser (pyparsing) is not thread-safe, so queries are parsed under a lock; only
+    evaluation runs concurrently.
+    """
+
+    def __init__(self, ontology_path: str, timeout: Optional[float] = None, prepared_cache_size: int = 256):
+        self.prepared_cache_size = prepared_cache_size
+        self._prepared = OrderedDict()
+        self._prepare_lock = threading.Lock()
+        super().__init__(ontology_path, timeout)
+
+    def load_data(self):
+        graph = rdflib.Graph()
+        graph.parse(self.ontology_path)
+        self.graph = graph
+
+    def _prepare(self, query: str):
+        """Returns the parsed form of a query, reusing it if the same text was seen before."""
+        with self._prepare_lock:
+            prepared = self._prepared.get(query)
+            if prepared is not None:
+                self._prepared.move_to_end(query)
+                return prepared
+
+            try:
+                prepared = prepareQuery(query)
+            except Exception as e:
+                raise QuerySyntaxError(str(e)) from e
+            self._prepared[query] = prepared
+            if len(self._prepared) > self.prepared_cache_size:
+                self._prepared.popitem(last=False)
+            return prepared
+
+    def execute(self, query: str) -> List[Dict]:
+        result = self.graph.query(self._prepare(query))
+        return [
+            {var: rdflib_term_to_binding(term) for var, term in row.asdict().items()}
+            for row in result
+        ]
+
+
+class OxigraphBackend(LocalBackend):
+    """Answers queries from an in-memory, fully indexed Oxigraph store of the ontology."""
+
+    def load_data(self):
+        store = pyoxigraph.Store()
+        store.load(path=self.ontology_path)
+        self.store = store
+
+    def execute(self, query: str) -> List[Dict]:
+        try:
+            solutions = self.store.query(query)
+        except SyntaxError as e:
+            raise QuerySyntaxError(str(e)) from e
+        variables = [(variable, variable.value) for variable in solutions.variables]
+        bindings = []
+        for solution in solutions:
+            row = {}
+            for variable, name in variables:
+                term = solution[variable]
+                if term is not None:
+                    row[name] = oxigraph_term_to_binding(term)
+            bindings.append(row)
+        return bindings
+
+
+def normalize_query(query: str) -> str:
+    """Collapses insignificant whitespace and drops comments so equivalent query texts share cache and in-flight
+    entries."""
+    return QUERY_TOKEN_PATTERN.sub(lambda match: match.group(1) or " ", query).strip()
+
+
+def ontology_version(ontology_path: str) -> str:
+    """Returns a short content hash identifying the current version of an ontology file."""
+    digest = hashlib.sha256()
+    with open(ontology_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+def rdflib_term_to_binding(term: rdflib.term.Node) -> Dict:
+    """Converts an rdflib term to the SPARQL 1.1 JSON results binding format."""
+    if isinstance(term, rdflib.URIRef):
+        return {"type": "uri", "value": str(term)}
+    if isinstance(term, rdflib.BNode):
+        return {"type": "bnode", "value": str(term)}
+
+    binding = {"type": "literal", "value": str(term)}
+    if term.language:
+        binding["xml:lang"] = term.language
+    elif term.datatype and str(term.datatype) != XSD_STRING:
+        binding["datatype"] = str(term.datatype)
+    return binding
+
+
+def oxigraph_term_to_binding(term) -> Dict:
+    """Converts an Oxigraph term to the SPARQL 1.1 JSON results binding format."""
+    if isinstance(term, pyoxigraph.NamedNode):
+        return {"type": "uri", "value": term.value}
+    if isinstance(term, pyoxigraph.BlankNode):
+        return {"type": "bnode", "value": term.value}
+
+    binding = {"type": "literal", "value": term.value}
+    if term.language:
+        binding["xml:lang"] = term.language
+    elif term.datatype.value != XSD_STRING:
+        binding["datatype"] = term.datatype.value
+    return binding
+
 
 class SPARQLClient:
-    def __init__(self, endpoint: str):
+    def __init__(
+        self,
+        endpoint: Optional[str] = None,
+        backend=None,
+        pool_size: int = 20,
+        timeout: float = 30.0,
+        dataset_version: str = "1",
+        cache: Optional[QueryCache] = None,
+        raw_cache: Optional[QueryCache] = None,
+        raw_workers: int = 2,
+    ):
+        if backend is None:
+            if endpoint is None:
+                raise ValueError("Either an endpoint or a backend must be provided.")
+            backend = HTTPBackend(endpoint, pool_size, timeout, dataset_version)
         self.endpoint = endpoint
-        self.sparql = SPARQLWrapper(self.endpoint)
-        self.sparql.setReturnFormat(JSON)
-
-    def query(self, query: str) -> List[Dict]:
-        """Executes a SPARQL query and returns the results as a list of dictionaries."""
-        self.sparql.setQuery(query)
-        results = self.sparql.query().convert()
-        return results["results"]["bindings"]
\ No newline at end of file
+        self.backend = backend
+        self.cache = cache if cache is not None else QueryCache()
+        self.cache.invalidate(self.dataset_version)
+        self.raw_cache = raw_cache if raw_cache is not None else QueryCache(max_size=64, max_rows=50000)
+        self.raw_cache.invalidate(self.dataset_version)
+        self.raw_pool = IsolatedPool(raw_workers)
+        self.singleflight = SingleFlight()
+
+    @classmethod
+    def from_ontology(
+        cls,
+        ontology_path: str,
+        engine: Optional[str] = None,
+        cache: Optional[QueryCache] = None,
+        raw_cache: Optional[QueryCache] = None,
+        raw_workers: int = 2,
+        timeout: Optional[float] = None,
+    ) -> "SPARQLClient":
+        """Creates a client that answers queries in-process from the given ontology file.
+
+        The engine is either "oxigraph" or "rdflib"; by default Oxigraph is used when it is installed.
+        timeout is the default limit in seconds for queries that do not pass their own.
+        """
+        if engine is None:
+            engine = "oxigraph" if pyoxigraph is not None else "rdflib"
+
+        if engine == "oxigraph":
+            if pyoxigraph is None:
+                raise ImportError("pyoxigraph is required for the oxigraph engine.")
+            backend = OxigraphBackend(ontology_path, timeout)
+        elif engine == "rdflib":
+            backend = RDFLibBackend(ontology_path, timeout)
+        else:
+            raise ValueError(f"Unknown local SPARQL engine: {engine}")
+        return cls(backend=backend, cache=cache, raw_cache=raw_cache, raw_workers=raw_workers)
+
+    @property
+    def dataset_version(self) -> str:
+        return self.backend.version
+
+    async def query(self, query: str, timeout: Optional[float] = None, cached: bool = False) -> List[Dict]:
+        """Executes a SPARQL query and returns the results as a list of dictionaries.
+
+        Concurrent calls with the same normalized query text share a single upstream request. With
+        cached=True the result is also kept until it expires or the dataset version changes. Results
+        may be shared between callers and must not be modified.
+        """
+        version = self.dataset_version
+        key = (version, normalize_query(query))
+        if not cached:
+            return await self.singleflight.do(key, lambda: self.backend.query(query, timeout))
+
+        hit, result = self.cache.get(key)
+        if hit:
+            return result
+
+        result = await self.singleflight.do(key, lambda: self.backend.query(query, timeout))
+        self.cache.set(key, result, version)
+        return result
+
+    async def query_raw(self, query: str, timeout: Optional[float] = None) -> List[Dict]:
+        """Executes an ad-hoc user query on the isolated raw_pool, caching the result in raw_cache.
+
+        Keeping both apart means slow or numerous ad-hoc queries cannot evict the application's cached
+        results or occupy the workers its own queries run on. Raises QueryCapacityError when every worker
+        of the pool is busy.
+        """
+        version = self.dataset_version
+        key = ("raw", version, normalize_query(query))
+        hit, result = self.raw_cache.get(key)
+        if hit:
+            return result
+
+        result = await self.singleflight.do(key, lambda: self.backend.query_isolated(query, timeout, self.raw_pool))
+        self.raw_cache.set(key, result, version)
+        return result
+
+    def stats(self) -> Dict:
+        return {
+            **self.cache.stats(),
+            "coalesced": self.singleflight.coalesced,
+            "inFlight": self.singleflight.in_flight,
+            "raw": {**self.raw_cache.stats(), "busyWorkers": self.raw_pool.busy, "workers": self.raw_pool.workers},
+        }
+
+    async def reload(self, version: Optional[str] = None) -> str:
+        """Reloads the dataset and invalidates every cached result. Returns the new dataset version."""
+        await self.backend.reload(version)
+        self.cache.invalidate(self.dataset_version)
+        self.raw_cache.invalidate(self.dataset_version)
+        return self.dataset_version
+
+    async def aclose(self):
+        """Releases the connections held by the backend and the workers of the raw query pool."""
+        await self.backend.aclose()
+        self.raw_pool.shutdown()
@@ -0,0 +1,144 @@
+from typing import List, Optional, Tuple
+import os
+import numpy as np
+from .similarity import EmbeddingIndex, top_k
+
+IVF_FORMAT_VERSION = 1
+
+
+def spherical_kmeans(vectors: np.ndarray, n_clusters: int, n_iter: int = 10, seed: int = 0) -> np.ndarray:
+    """Clusters unit-length vectors by cosine similarity and returns the unit-length centroids."""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), n_clusters, replace=False)].copy()
+    for _ in range(n_iter):
+        assignments = assign_to_centroids(vectors, centroids)
+        counts = np.bincount(assignments, minlength=n_clusters)
+        order = np.argsort(assignments, kind="stable")
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        non_empty = counts > 0
+        sums = np.zeros_like(centroids)
+        sums[non_empty] = np.add.reduceat(vectors[order], starts[non_empty], axis=0)
+
+        # Empty clusters are re-seeded with random vectors so every list stays useful.
+        empty = np.flatnonzero(counts == 0)
+        if len(empty):
+            sums[empty] = vectors[rng.choice(len(vectors), len(empty), replace=False)]
+
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        centroids = (sums / norms).astype(np.float32)
+    return centroids
+
+
+def assign_to_centroids(vectors: np.ndarray, centroids: np.ndarray, chunk_size: int = 16384) -> np.ndarray:
+    """Returns the index of the most similar centroid for every vector, in bounded-size chunks."""
+    assignments = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), chunk_size):
+        chunk = vectors[start:start + chunk_size]
+        assignments[start:start + chunk_size] = np.argmax(chunk @ centroids.T, axis=1)
+    return assignments
+
+
+class IVFFlatIndex:
+    """Approximate cosine search with an inverted-file (IVF-flat) index.
+
+    Embeddings are bucketed by their nearest k-means centroid. A query ranks the centroids and scans only
+    the rows of the n_probe closest buckets exactly, so n_probe trades recall for latency: probing every
+    list gives the same results as the exact EmbeddingIndex.
+    """
+
+    def __init__(self, index: EmbeddingIndex, centroids: np.ndarray, offsets: np.ndarray, rows: np.ndarray):
+        self.index = index
+        self.centroids = centroids
+        self.offsets = offsets
+        self.rows = rows
+
+    @property
+    def n_lists(self) -> int:
+        return len(self.centroids)
+
+    @classmethod
+    def build(
+        cls,
+        index: EmbeddingIndex,
+        n_lists: Optional[int] = None,
+        n_iter: int = 10,
+        sample_size: Optional[int] = None,
+        seed: int = 0,
+    ) -> "IVFFlatIndex":
+        """Trains the centroids (on a sample of at most sample_size vectors) and assigns every row to a list."""
+        vectors = index.matrix
+        if n_lists is None:
+            n_lists = int(np.sqrt(len(vectors)))
+        n_lists = max(1, min(n_lists, len(vectors)))
+        if sample_size is None:
+            sample_size = 256 * n_lists
+
+        rng = np.random.default_rng(seed)
+        if len(vectors) > sample_size:
+            sample = vectors[np.sort(rng.choice(len(vectors), sample_size, replace=False))]
+        else:
+            sample = vectors
+        centroids = spherical_kmeans(sample, n_lists, n_iter, seed)
+
+        assignments = assign_to_centroids(vectors, centroids)
+        rows = np.argsort(assignments, kind="stable").astype(np.int64)
+        offsets = np.zeros(n_lists + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assignments, minlength=n_lists), out=offsets[1:])
+        return cls(index, centroids, offsets, rows)
+
+    def search_vector(
+        self,
+        vector: np.ndarray,
+        k: int = 15,
+        n_probe: int = 8,
+        min_score: Optional[float] = None,
+        exclude: Optional[int] = None,
+    ) -> List[Tuple[str, float]]:
+        """Returns up to k approximate (id, cosine similarity) pairs for a unit-length query vector."""
+        vector = np.asarray(vector, dtype=np.float32)
+        probes = top_k(self.centroids @ vector, n_probe)
+        candidates = np.concatenate([self.rows[self.offsets[probe]:self.offsets[probe + 1]] for probe in probes])
+        if exclude is not None:
+            candidates = candidates[candidates != exclude]
+
+        scores = self.index.matrix[candidates] @ vector
+        best = top_k(scores, k)
+        if min_score is not None:
+            best = best[scores[best] >= min_score]
+        return [(self.index.ids[candidates[i]], float(scores[i])) for i in best]
+
+    def search(
+        self, entity: str, k: int = 15, n_probe: int = 8, min_score: Optional[float] = None
+    ) -> Optional[List[Tuple[str, float]]]:
+        """Returns approximately the k entities most similar to the given one, or None if it has no embedding."""
+        row = self.index.rows.get(entity)
+        if row is None:
+            return None
+        return self.search_vector(self.index.matrix[row], k, n_probe, min_score, exclude=row)
+
+    def save(self, path: str):
+        """Writes the index under a temporary name and moves it into place, so readers never see a partial file."""
+        with open(f"{path}.tmp", "wb") as f:
+            np.savez(
+                f,
+                format_version=IVF_FORMAT_VERSION,
+                fingerprint=self.index.fingerprint(),
+                centroids=self.centroids,
+                offsets=self.offsets,
+                rows=self.rows,
+            )
+        os.replace(f"{path}.tmp", path)
+
+    @classmethod
+    def load(cls, path: str, index: EmbeddingIndex) -> Optional["IVFFlatIndex"]:
+        """Loads a saved index, or returns None if it is missing or was built from other embeddings."""
+        try:
+            with np.load(path) as data:
+                if int(data["format_version"]) != IVF_FORMAT_VERSION:
+                    return None
+                if str(data["fingerprint"]) != index.fingerprint():
+                    return None
+                return cls(index, data["centroids"], data["offsets"], data["rows"])
+        except FileNotFoundError:
+            return None
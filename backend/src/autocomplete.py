@@ -0,0 +1,69 @@
+from typing import Dict, List
+from bisect import bisect_left
+import heapq
+from .text_index import esolang_name_text
+
+# Prefixes matching more keys than this get their top results precomputed, so a lookup never scans more.
+AUTOCOMPLETE_SCAN_LIMIT = 64
+# Largest number of suggestions a lookup can return.
+AUTOCOMPLETE_MAX_RESULTS = 50
+
+
+def degree(esolang: Dict) -> int:
+    """Number of influence links of an esolang, used to rank suggestions."""
+    return len(esolang["influenced"]) + len(esolang["influencedBy"])
+
+
+class AutocompleteIndex:
+    """Sorted array of the case-folded names and aliases of the esolangs, for prefix suggestions.
+
+    A prefix maps to a contiguous range of keys found by binary search. Ranges larger than
+    AUTOCOMPLETE_SCAN_LIMIT (short prefixes) have their best AUTOCOMPLETE_MAX_RESULTS esolangs precomputed;
+    smaller ones are ranked on the fly, so every lookup does a bounded amount of work.
+    """
+
+    def __init__(self, esolangs: List[Dict]):
+        entries = []
+        for row, esolang in enumerate(esolangs):
+            for text in (esolang_name_text(esolang["name"]), esolang.get("alias")):
+                if text:
+                    entries.append((text.casefold(), row))
+        entries.sort()
+        self.esolangs = esolangs
+        self.keys = [key for key, _ in entries]
+        self.rows = [row for _, row in entries]
+        self.scores = [degree(esolang) for esolang in esolangs]
+
+        self.top: Dict[str, List[int]] = {}
+        for key in dict.fromkeys(self.keys):
+            for length in range(1, len(key) + 1):
+                prefix = key[:length]
+                if prefix in self.top:
+                    continue
+                start, end = self.range(prefix)
+                if end - start <= AUTOCOMPLETE_SCAN_LIMIT:
+                    break
+                self.top[prefix] = self.rank(start, end, AUTOCOMPLETE_MAX_RESULTS)
+
+    def range(self, prefix: str):
+        start = bisect_left(self.keys, prefix)
+        return start, bisect_left(self.keys, prefix + "\U0010ffff", start)
+
+    def rank(self, start: int, end: int, limit: int) -> List[int]:
+        """Best distinct esolangs among the keys in [start, end): highest degree first, then by key."""
+        best = {}
+        for position in range(start, end):
+            best.setdefault(self.rows[position], position)
+        ranked = heapq.nsmallest(limit, best.items(), key=lambda item: (-self.scores[item[0]], item[1]))
+        return [row for row, _ in ranked]
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[str]:
+        """Returns the names of up to limit esolangs whose name or alias starts with the prefix."""
+        prefix = prefix.casefold()
+        if not prefix:
+            return []
+        limit = min(limit, AUTOCOMPLETE_MAX_RESULTS)
+        rows = self.top.get(prefix)
+        if rows is None:
+            rows = self.rank(*self.range(prefix), limit)
+        return [self.esolangs[row]["name"] for row in rows[:limit]]
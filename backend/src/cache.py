@@ -0,0 +1,91 @@
+from typing import Any, Dict, Hashable, Optional, Tuple
+from collections import OrderedDict
+import threading
+import time
+
+
+class QueryCache:
+    """Bounded LRU cache with a per-entry TTL, scoped to a dataset version.
+
+    Every entry belongs to the dataset version that was current when it was stored, so switching
+    to a new version drops all of them at once. With max_rows, the entries (lists of result rows) are
+    also bounded by their total number of rows, and a single result larger than that is not stored.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 256,
+        ttl: Optional[float] = 3600.0,
+        version: Optional[str] = None,
+        max_rows: Optional[int] = None,
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.version = version
+        self.max_rows = max_rows
+        self.rows = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """Returns (True, value) for a live entry and (False, None) otherwise."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, value
+                self._remove(key)
+            self.misses += 1
+            return False, None
+
+    def set(self, key: Hashable, value: Any, version: Optional[str] = None):
+        """Stores a value, unless it was computed for a dataset version that is no longer current."""
+        with self._lock:
+            if version is not None and version != self.version:
+                return
+            if self.max_rows is not None and len(value) > self.max_rows:
+                return
+            if key in self._entries:
+                self._remove(key)
+            expires_at = time.monotonic() + self.ttl if self.ttl else None
+            self._entries[key] = (value, expires_at)
+            if self.max_rows is not None:
+                self.rows += len(value)
+            while len(self._entries) > self.max_size or (self.max_rows is not None and self.rows > self.max_rows):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key: Hashable):
+        value, _ = self._entries.pop(key)
+        if self.max_rows is not None:
+            self.rows -= len(value)
+
+    def invalidate(self, version: Optional[str] = None):
+        """Drops every entry and, if given, switches to a new dataset version."""
+        with self._lock:
+            self._entries.clear()
+            self.rows = 0
+            if version is not None:
+                self.version = version
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "version": self.version,
+                "size": len(self._entries),
+                "maxSize": self.max_size,
+                "rows": self.rows if self.max_rows is not None else None,
+                "maxRows": self.max_rows,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hitRatio": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,96 @@
+from typing import Dict, List, Optional, Tuple
+from bisect import bisect_right
+import base64
+import json
+import numpy as np
+from .queries import BASE_URI
+from .text_index import TextIndex
+from .autocomplete import AutocompleteIndex
+from .facets import FacetIndex
+from .utils import get_esolang_from_property_rows, group_rows_by_esolang
+
+
+class Catalogue:
+    """Every esolang of one dataset version with its details, held in memory to answer searches, suggestions and facet filters.
+
+    Built from ESOLANGS_NAME_LIST_QUERY and create_all_esolangs_details_query whenever the dataset version
+    changes; esolangs are kept in name order.
+    """
+
+    def __init__(self, esolangs: List[Dict], version: str):
+        self.version = version
+        self.esolangs = sorted(esolangs, key=lambda esolang: esolang["name"])
+        self.names = [esolang["name"] for esolang in self.esolangs]
+        self.rows = {name: row for row, name in enumerate(self.names)}
+        self.text_index = TextIndex(self.esolangs)
+        self.autocomplete = AutocompleteIndex(self.esolangs)
+        self.facets = FacetIndex(self.esolangs)
+
+    @classmethod
+    def from_query_results(cls, names_result: List[Dict], details_result: List[Dict], version: str) -> "Catalogue":
+        rows_by_iri = group_rows_by_esolang(details_result)
+        names = dict.fromkeys(esolang["name"]["value"] for esolang in names_result)
+        esolangs = [get_esolang_from_property_rows(name, rows_by_iri.get(f"{BASE_URI}{name}", [])) for name in names]
+        return cls(esolangs, version)
+
+    def __len__(self) -> int:
+        return len(self.esolangs)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.rows
+
+    def select(self, search_term: Optional[str], filters: Dict[str, Optional[List[str]]]) -> np.ndarray:
+        """Rows of the esolangs matching the search term and facet filters.
+
+        Ordered by relevance when a search term is given and by name otherwise.
+        """
+        mask = self.facets.match(filters)
+        if search_term:
+            rows = [doc for doc, _ in self.text_index.search(search_term) if mask is None or mask[doc]]
+            return np.array(rows, dtype=np.int64)
+        return np.arange(len(self)) if mask is None else np.flatnonzero(mask)
+
+    def page(
+        self, search_term: Optional[str], filters: Dict[str, Optional[List[str]]], after: Optional[List], limit: int
+    ) -> Tuple[List[str], int, Optional[List]]:
+        """One page of the esolangs select() returns, starting after the given sort key.
+
+        The sort key is [name] without a search term and [score, name] with one. The start of the page is
+        found by binary search, so every page costs the same however deep it is. Returns the names on the
+        page, the total number of matches and the key to pass for the next page (None on the last page).
+        """
+        mask = self.facets.match(filters)
+        if search_term:
+            ranked = [(doc, score) for doc, score in self.text_index.search(search_term) if mask is None or mask[doc]]
+            keys = [(-score, self.names[doc]) for doc, score in ranked]
+            start = bisect_right(keys, (-after[0], after[1])) if after else 0
+            page = ranked[start:start + limit]
+            names = [self.names[doc] for doc, _ in page]
+            next_key = [page[-1][1], names[-1]] if page and start + limit < len(ranked) else None
+            return names, len(ranked), next_key
+
+        rows = np.arange(len(self)) if mask is None else np.flatnonzero(mask)
+        start = int(np.searchsorted(rows, bisect_right(self.names, after[0]))) if after else 0
+        names = [self.names[row] for row in rows[start:start + limit]]
+        next_key = [names[-1]] if names and start + limit < len(rows) else None
+        return names, len(rows), next_key
+
+
+def encode_cursor(key: List) -> str:
+    """Opaque page token for a sort key returned by Catalogue.page."""
+    return base64.urlsafe_b64encode(json.dumps(key, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, with_score: bool) -> List:
+    """Sort key of a page token; raises ValueError if it is not a token for this kind of search."""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except Exception:
+        raise ValueError("Invalid cursor.")
+    if with_score:
+        valid = isinstance(key, list) and len(key) == 2 and isinstance(key[0], (int, float)) and isinstance(key[1], str)
+    else:
+        valid = isinstance(key, list) and len(key) == 1 and isinstance(key[0], str)
+    if not valid:
+        raise ValueError("Invalid cursor.")
+    return key
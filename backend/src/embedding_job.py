@@ -0,0 +1,94 @@
+from typing import Awaitable, Callable, Dict, Optional
+from datetime import datetime, timezone
+import asyncio
+import fcntl
+import logging
+
+ProgressCallback = Callable[[str, float], None]
+
+
+def acquire_file_lock(path: str):
+    """Takes an exclusive lock on the given file without blocking; returns the open file, or None if it is held."""
+    lock_file = open(path, "a+")
+    try:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock_file.close()
+        return None
+    return lock_file
+
+
+def release_file_lock(lock_file):
+    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+    lock_file.close()
+
+
+class EmbeddingJob:
+    """Runs the embedding build in the background and reports its progress.
+
+    At most one build runs at a time: within a process the job refuses to start while running, and across
+    worker processes an exclusive lock on lock_path ensures a single writer of the embedding files.
+    """
+
+    def __init__(self, lock_path: str):
+        self.lock_path = lock_path
+        self.state = "idle"
+        self.stage: Optional[str] = None
+        self.progress = 0.0
+        self.started_at: Optional[str] = None
+        self.finished_at: Optional[str] = None
+        self.error: Optional[str] = None
+        self.stats: Optional[Dict] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self.state == "running"
+
+    def start(self, build: Callable[[ProgressCallback], Awaitable[Optional[Dict]]]) -> bool:
+        """Starts build(report) as a background task. Returns False if a build is already running here or elsewhere."""
+        if self.running:
+            return False
+        lock_file = acquire_file_lock(self.lock_path)
+        if lock_file is None:
+            return False
+
+        self.state = "running"
+        self.stage = "starting"
+        self.progress = 0.0
+        self.started_at = datetime.now(timezone.utc).isoformat()
+        self.finished_at = None
+        self.error = None
+        self.stats = None
+        self._task = asyncio.create_task(self._run(build, lock_file))
+        return True
+
+    def report(self, stage: str, progress: float):
+        """Progress callback handed to the build; safe to call from a worker thread."""
+        self.stage = stage
+        self.progress = progress
+
+    async def _run(self, build: Callable[[ProgressCallback], Awaitable[Optional[Dict]]], lock_file):
+        try:
+            self.stats = await build(self.report)
+            self.state = "succeeded"
+            self.stage = None
+            self.progress = 1.0
+        except Exception as e:
+            logging.error(f"Embedding build failed: {e}", exc_info=True)
+            self.state = "failed"
+            self.error = str(e)
+        finally:
+            self.finished_at = datetime.now(timezone.utc).isoformat()
+            release_file_lock(lock_file)
+
+    def status(self) -> Dict:
+        return {
+            "state": self.state,
+            "stage": self.stage,
+            "progress": round(self.progress, 4),
+            "startedAt": self.started_at,
+            "finishedAt": self.finished_at,
+            "error": self.error,
+            "stats": self.stats,
+        }
@@ -0,0 +1,81 @@
+from typing import Dict, List, Optional
+import json
+import os
+import numpy as np
+from .similarity import EmbeddingIndex, normalize_rows
+
+EMBEDDING_STORE_FORMAT_VERSION = 1
+
+
+class StaleEmbeddingStoreError(Exception):
+    """Raised when the stored embeddings were written in another format or do not match their index."""
+
+
+def matrix_path(path: str) -> str:
+    return f"{path}.npy"
+
+
+def index_path(path: str) -> str:
+    return f"{path}.ids.json"
+
+
+def save_embedding_store(
+    path: str, ids: List[str], matrix: np.ndarray, metadata: Optional[Dict] = None, normalize: bool = True
+) -> EmbeddingIndex:
+    """Writes float32 embeddings (L2-normalized unless normalize is False) as an .npy matrix plus an id index
+    and reopens them memory-mapped.
+
+    Both files are written under temporary names and moved into place, matrix first, so readers never see a
+    half-written file; the index carries the format version, a fingerprint of the matrix it describes and any
+    JSON-serializable metadata.
+    """
+    matrix = normalize_rows(matrix) if normalize else np.ascontiguousarray(matrix, dtype=np.float32)
+    index = EmbeddingIndex(ids, matrix, normalized=True)
+    header = {
+        "formatVersion": EMBEDDING_STORE_FORMAT_VERSION,
+        "dtype": "float32",
+        "count": len(index),
+        "dimension": int(index.matrix.shape[1]) if index.matrix.ndim == 2 else 0,
+        "fingerprint": index.fingerprint(),
+        "ids": list(ids),
+        "metadata": metadata or {},
+    }
+
+    with open(f"{matrix_path(path)}.tmp", "wb") as f:
+        np.save(f, index.matrix)
+    with open(f"{index_path(path)}.tmp", "w", encoding="utf-8") as f:
+        json.dump(header, f)
+    os.replace(f"{matrix_path(path)}.tmp", matrix_path(path))
+    os.replace(f"{index_path(path)}.tmp", index_path(path))
+
+    return load_embedding_store(path)
+
+
+def load_embedding_store(path: str) -> Optional[EmbeddingIndex]:
+    """Opens the stored embeddings read-only with mmap_mode, so worker processes share them through the page cache.
+
+    Returns None if nothing has been stored yet and raises StaleEmbeddingStoreError if the files cannot be trusted.
+    """
+    try:
+        with open(index_path(path), "r", encoding="utf-8") as f:
+            header = json.load(f)
+        matrix = np.load(matrix_path(path), mmap_mode="r")
+    except FileNotFoundError:
+        return None
+    except (ValueError, OSError) as e:
+        raise StaleEmbeddingStoreError(f"Unreadable embedding store at {path}: {e}")
+
+    if header.get("formatVersion") != EMBEDDING_STORE_FORMAT_VERSION:
+        raise StaleEmbeddingStoreError(
+            f"Embedding store format {header.get('formatVersion')} is not {EMBEDDING_STORE_FORMAT_VERSION}."
+        )
+    expected_shape = (header["count"], header["dimension"])
+    if matrix.dtype != np.float32 or matrix.shape != expected_shape or len(header["ids"]) != header["count"]:
+        raise StaleEmbeddingStoreError(
+            f"Embedding matrix {matrix.dtype}{matrix.shape} does not match its index {expected_shape}."
+        )
+
+    index = EmbeddingIndex(header["ids"], matrix, normalized=True, metadata=header.get("metadata"))
+    if index.fingerprint() != header["fingerprint"]:
+        raise StaleEmbeddingStoreError("Embedding matrix does not match the fingerprint in its index.")
+    return index
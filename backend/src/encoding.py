@@ -0,0 +1,118 @@
+from typing import Callable, Dict, List, Optional, Tuple
+import logging
+import os
+import time
+import numpy as np
+
+try:
+    import onnxruntime
+    from tokenizers import Tokenizer
+except ImportError:
+    onnxruntime = None
+
+ENCODERS = ("torch", "onnx")
+
+
+class OnnxSentenceEncoder:
+    """Runs an exported (optionally dynamically quantized) ONNX sentence-transformers model on CPU.
+
+    Reproduces the all-MiniLM-L6-v2 pipeline: tokenize, run the transformer, mean-pool the token
+    embeddings over the attention mask and L2-normalize. The model directory holds model.onnx (or
+    model_quantized.onnx) and tokenizer.json, as written by export_onnx_model.py.
+    """
+
+    def __init__(self, model_dir: str, quantized: bool = False, threads: int = 0, max_length: int = 256):
+        if onnxruntime is None:
+            raise RuntimeError("The ONNX encoder needs the onnxruntime and tokenizers packages.")
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        model_file = "model_quantized.onnx" if quantized else "model.onnx"
+        self.session = onnxruntime.InferenceSession(
+            os.path.join(model_dir, model_file), options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length)
+        self.tokenizer.enable_padding()
+        self.dimension = self.session.get_outputs()[0].shape[-1]
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimension
+
+    def encode(self, sentences: List[str], batch_size: int = 64, **kwargs) -> np.ndarray:
+        output = np.empty((len(sentences), self.dimension), dtype=np.float32)
+        for start in range(0, len(sentences), batch_size):
+            encodings = self.tokenizer.encode_batch(sentences[start:start + batch_size])
+            inputs = {
+                "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+                "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+                "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+            }
+            tokens = self.session.run(None, {name: inputs[name] for name in self.input_names})[0]
+            mask = inputs["attention_mask"][:, :, None].astype(np.float32)
+            pooled = (tokens * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+            norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+            output[start:start + len(encodings)] = pooled / np.maximum(norms, 1e-12)
+        return output
+
+
+def load_encoder(encoder: str, model_name: str, onnx_model_dir: Optional[str] = None, quantized: bool = False):
+    """Returns the sentence encoder for the given backend: "torch" (sentence-transformers) or "onnx"."""
+    if encoder == "onnx":
+        return OnnxSentenceEncoder(onnx_model_dir, quantized)
+    if encoder == "torch":
+        # Imported here so the ONNX path never pays for importing torch.
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(model_name)
+    raise ValueError(f"Unknown encoder {encoder!r}, expected one of {ENCODERS}.")
+
+
+def encode_texts(
+    model,
+    texts: List[str],
+    batch_size: int = 64,
+    processes: int = 1,
+    chunk_size: int = 4096,
+    progress: Optional[Callable[[float], None]] = None,
+) -> Tuple[np.ndarray, Dict]:
+    """Encodes texts into a preallocated float32 matrix whose row i is the embedding of texts[i].
+
+    Texts are encoded shortest first, so each batch holds texts of similar length and little padding is
+    wasted; every chunk of chunk_size texts is written straight into its rows of the output. With more than
+    one process, each chunk of a sentence-transformers model is sharded across a pool of CPU worker processes
+    (the ONNX runtime already uses every core within the process). progress, if given, receives the encoded
+    fraction after each chunk. Returns the matrix and the encoding throughput.
+    """
+    dimension = model.get_sentence_embedding_dimension()
+    output = np.empty((len(texts), dimension), dtype=np.float32)
+    order = np.argsort(np.fromiter((len(text) for text in texts), dtype=np.int64, count=len(texts)), kind="stable")
+
+    use_pool = processes > 1 and len(texts) and hasattr(model, "start_multi_process_pool")
+    pool = model.start_multi_process_pool(["cpu"] * processes) if use_pool else None
+    start = time.perf_counter()
+    try:
+        for offset in range(0, len(texts), chunk_size):
+            rows = order[offset:offset + chunk_size]
+            chunk = [texts[row] for row in rows]
+            if pool is not None:
+                output[rows] = model.encode_multi_process(
+                    chunk, pool, batch_size=batch_size, chunk_size=max(1, -(-len(chunk) // processes))
+                )
+            else:
+                output[rows] = model.encode(chunk, batch_size=batch_size, convert_to_numpy=True)
+            if progress is not None:
+                progress((offset + len(rows)) / len(texts))
+    finally:
+        if pool is not None:
+            model.stop_multi_process_pool(pool)
+
+    seconds = time.perf_counter() - start
+    stats = {
+        "encodeSeconds": round(seconds, 3),
+        "sentencesPerSecond": round(len(texts) / seconds, 1) if seconds > 0 else None,
+        "batchSize": batch_size,
+        "processes": processes,
+    }
+    logging.info(f"Encoded {len(texts)} texts in {seconds:.2f}s ({stats['sentencesPerSecond']} sentences/s)")
+    return output, stats
@@ -0,0 +1,107 @@
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from .queries import BASE_URI
+
+# Search parameters mapped to the esolang field they filter on and the IRI path of their values
+# (None for literal values).
+FACETS = {
+    "paradigm": ("paradigms", "paradigm"),
+    "category": ("categories", "category"),
+    "memory_system": ("memorySystem", "memory-system"),
+    "dimension": ("dimensions", "dimension"),
+    "computational_class": ("computationalClasses", "computational-class"),
+    "type_system": ("typeSystems", "type-system"),
+    "dialect": ("dialects", "dialect"),
+    "file_extension": ("fileExtensions", None),
+    "year_created": ("yearCreated", None),
+}
+# Facets where an esolang matches if it has any of the requested values; the others need all of them,
+# as in create_esolang_search_query.
+ANY_VALUE_FACETS = {"year_created"}
+
+
+def facet_values(esolang: Dict, field: str, path: Optional[str]) -> List[str]:
+    """The values of an esolang for a facet, as they are passed to the search endpoint."""
+    values = esolang.get(field)
+    if values is None:
+        return []
+    if not isinstance(values, list):
+        values = [values]
+    if path is None:
+        return values
+    prefix = f"{BASE_URI}{path}/"
+    return [value[len(prefix):] for value in values if value.startswith(prefix)]
+
+
+def camel_case(name: str) -> str:
+    first, *rest = name.split("_")
+    return first + "".join(part.capitalize() for part in rest)
+
+
+class FacetIndex:
+    """One bitmap per facet value over the dense row ids of the catalogue's esolangs.
+
+    Bitmaps are stored bit-packed (np.packbits), so a filter combination is a few bitwise ANDs and ORs
+    over arrays of len(esolangs) / 8 bytes. For counting, every (row, value) pair of every facet is also
+    kept as flat arrays of rows and global value ids, so the counts of all facets are one bincount.
+    """
+
+    def __init__(self, esolangs: List[Dict]):
+        self.size = len(esolangs)
+        self.bitmaps: Dict[str, Dict[str, np.ndarray]] = {}
+        self.values: List[Tuple[str, str]] = []
+        pair_rows, pair_values = [], []
+        for facet, (field, path) in FACETS.items():
+            rows_by_value: Dict[str, List[int]] = {}
+            for row, esolang in enumerate(esolangs):
+                for value in facet_values(esolang, field, path):
+                    rows_by_value.setdefault(value, []).append(row)
+            self.bitmaps[facet] = {value: self.pack(rows) for value, rows in rows_by_value.items()}
+            for value, rows in sorted(rows_by_value.items()):
+                pair_rows.extend(rows)
+                pair_values.extend([len(self.values)] * len(rows))
+                self.values.append((facet, value))
+        self.pair_rows = np.array(pair_rows, dtype=np.int32)
+        self.pair_values = np.array(pair_values, dtype=np.int32)
+        self.empty = np.zeros((self.size + 7) // 8, dtype=np.uint8)
+
+    def pack(self, rows: List[int]) -> np.ndarray:
+        mask = np.zeros(self.size, dtype=bool)
+        mask[rows] = True
+        return np.packbits(mask)
+
+    def bitmap(self, facet: str, value: str) -> np.ndarray:
+        return self.bitmaps[facet].get(value, self.empty)
+
+    def match(self, filters: Dict[str, Optional[List[str]]]) -> Optional[np.ndarray]:
+        """Returns a boolean mask of the rows matching every filter, or None when no filter is given."""
+        result = None
+        for facet, values in filters.items():
+            if not values:
+                continue
+            if facet in ANY_VALUE_FACETS:
+                bitmap = np.bitwise_or.reduce([self.bitmap(facet, value) for value in values])
+            else:
+                bitmap = np.bitwise_and.reduce([self.bitmap(facet, value) for value in values])
+            result = bitmap if result is None else result & bitmap
+        if result is None:
+            return None
+        return np.unpackbits(result, count=self.size).astype(bool)
+
+    def value_lists(self) -> Dict[str, List[str]]:
+        """Every value of every facet in sorted order, facets keyed by their camelCase name."""
+        return {camel_case(facet): sorted(self.bitmaps[facet]) for facet in FACETS}
+
+    def counts(self, rows: np.ndarray) -> Dict[str, Dict[str, int]]:
+        """Counts, for every facet, how many of the given rows carry each value (values with no rows are left out).
+
+        Facets are keyed by their camelCase name, values are listed in sorted order.
+        """
+        selected = np.zeros(self.size, dtype=bool)
+        selected[rows] = True
+        totals = np.bincount(self.pair_values[selected[self.pair_rows]], minlength=len(self.values))
+        counts = {camel_case(facet): {} for facet in FACETS}
+        for value_id in np.flatnonzero(totals):
+            facet, value = self.values[value_id]
+            counts[camel_case(facet)][value] = int(totals[value_id])
+        return counts
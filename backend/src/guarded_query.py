@@ -0,0 +1,82 @@
+import re
+
+# String literals, IRIs and comments: their contents must not be mistaken for keywords or clauses.
+OPAQUE_PATTERN = re.compile(
+    r'"""(?:[^"\\]|\\.|"(?!""))*"""|\'\'\'(?:[^\'\\]|\\.|\'(?!\'\'))*\'\'\''
+    r'|"(?:[^"\\\n]|\\.)*"|\'(?:[^\'\\\n]|\\.)*\'|<[^<>\s]*>|#[^\n]*'
+)
+UPDATE_PATTERN = re.compile(
+    r"(?<![?$:\w])(INSERT|DELETE|LOAD|CLEAR|CREATE|DROP|COPY|MOVE|ADD|WITH)(?![\w:])", re.IGNORECASE
+)
+# SERVICE makes the engine call a remote endpoint and FROM may make it fetch a graph: either lets a caller
+# have the server request any URL.
+REMOTE_PATTERN = re.compile(r"(?<![?$:\w])(SERVICE|FROM)(?![\w:])", re.IGNORECASE)
+SELECT_PATTERN = re.compile(r"^\s*(?:(?:PREFIX\s+[\w.-]*:\s*_+|BASE\s+_+)\s*)*SELECT\b", re.IGNORECASE)
+# LIMIT and OFFSET clauses (in either order) at the very end of the query, i.e. those of the outermost SELECT.
+TRAILING_MODIFIERS_PATTERN = re.compile(r"(?:\s+(?:LIMIT|OFFSET)\s+\d+){1,2}\s*$", re.IGNORECASE)
+LIMIT_PATTERN = re.compile(r"LIMIT\s+(\d+)", re.IGNORECASE)
+VALUES_OR_BRACE_PATTERN = re.compile(r"[{}]|(?<![?$:\w])VALUES(?![\w:])", re.IGNORECASE)
+
+
+class RejectedQueryError(ValueError):
+    """Raised for user queries that may not run: anything but a read-only SELECT query over the local data."""
+
+
+def mask_opaque(query: str) -> str:
+    """Replaces literals and IRIs with underscores and comments with spaces, keeping offsets intact."""
+    def mask(match: re.Match) -> str:
+        return (" " if match.group().startswith("#") else "_") * len(match.group())
+
+    return OPAQUE_PATTERN.sub(mask, query)
+
+
+def guard_select_query(query: str, max_rows: int) -> str:
+    """Returns the query with its outermost LIMIT capped at max_rows + 1 (added when missing).
+
+    The extra row lets the caller tell whether the result was truncated. Raises RejectedQueryError for
+    update operations, SERVICE and FROM clauses and anything but SELECT queries.
+    """
+    masked = mask_opaque(query)
+    update = UPDATE_PATTERN.search(masked)
+    if update:
+        raise RejectedQueryError(f"Update operations are not allowed ({update.group(1).upper()}).")
+    remote = REMOTE_PATTERN.search(masked)
+    if remote:
+        raise RejectedQueryError(f"Queries may not reach other endpoints or graphs ({remote.group(1).upper()}).")
+    if not SELECT_PATTERN.match(masked):
+        raise RejectedQueryError("Only SELECT queries are allowed.")
+
+    # A trailing VALUES block follows the solution modifiers, so the LIMIT goes before it.
+    values = trailing_values_start(masked)
+    head, tail = query[:values], query[values:]
+    capped = cap_limit(head, masked[:values], max_rows)
+    if capped == head:
+        return query
+    return f"{capped}\n{tail}" if tail else capped
+
+
+def trailing_values_start(masked: str) -> int:
+    """Offset of the VALUES clause that ends the outermost query (the only one outside braces), or len(masked)."""
+    depth = 0
+    for match in VALUES_OR_BRACE_PATTERN.finditer(masked):
+        token = match.group()
+        if token == "{":
+            depth += 1
+        elif token == "}":
+            depth -= 1
+        elif depth == 0:
+            return match.start()
+    return len(masked)
+
+
+def cap_limit(query: str, masked: str, max_rows: int) -> str:
+    """Caps or appends the LIMIT among the trailing solution modifiers of a query without a VALUES block."""
+    modifiers = TRAILING_MODIFIERS_PATTERN.search(masked)
+    limit = LIMIT_PATTERN.search(modifiers.group()) if modifiers else None
+    if limit is None:
+        return f"{query.rstrip()}\nLIMIT {max_rows + 1}"
+    if int(limit.group(1)) <= max_rows:
+        return query
+    start = modifiers.start() + limit.start(1)
+    end = modifiers.start() + limit.end(1)
+    return f"{query[:start]}{max_rows + 1}{query[end:]}"
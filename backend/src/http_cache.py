@@ -0,0 +1,105 @@
+from typing import Dict, Optional, Tuple
+import gzip
+import hashlib
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Response class of the hot routes: orjson serializes several times faster than the standard library.
+FAST_JSON_RESPONSE = ORJSONResponse if orjson is not None else JSONResponse
+
+
+def dataset_etag(version: str, path: str, query: str = "") -> str:
+    """Strong ETag of a read-only response: it only changes when the dataset version or the request does."""
+    digest = hashlib.blake2b(f"{version}\0{path}?{query}".encode("utf-8"), digest_size=12).hexdigest()
+    return f'"{digest}"'
+
+
+# Content-codings a response body may be sent in besides identity; each gets its own ETag.
+CONTENT_CODINGS = ("gzip", "br")
+
+
+def encoded_etag(etag: str, encoding: Optional[str]) -> str:
+    """ETag of a content-coded variant: RFC 9110 requires distinct strong ETags for different codings."""
+    if not encoding or encoding == "identity":
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> Optional[str]:
+    """Evaluates an If-None-Match header against an ETag and its content-coded variants (weak comparison,
+    as RFC 9110 requires for it). Returns the matching ETag, which names the variant the client holds, or None.
+    """
+    if not if_none_match:
+        return None
+    if if_none_match.strip() == "*":
+        return etag
+    variants = {encoded_etag(etag, encoding) for encoding in ("identity", *CONTENT_CODINGS)}
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip().removeprefix("W/")
+        if candidate in variants:
+            return candidate
+    return None
+
+
+def accepted_encodings(accept_encoding: Optional[str]) -> Dict[str, float]:
+    """Parses an Accept-Encoding header into {coding: q-value}."""
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding.strip().lower()] = q
+    return accepted
+
+
+class Payload:
+    """A serialized response body with its gzip and (when the brotli package is installed) brotli variants."""
+
+    def __init__(self, body: bytes, media_type: str):
+        self.media_type = media_type
+        self.variants = {"identity": body, "gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            self.variants["br"] = brotli.compress(body, quality=11)
+
+    def select(self, accept_encoding: Optional[str]) -> Tuple[str, bytes]:
+        """Returns the smallest variant the client accepts (the uncompressed body is always acceptable)."""
+        accepted = accepted_encodings(accept_encoding)
+        wildcard = accepted.get("*", 0.0)
+        candidates = [
+            coding for coding in self.variants
+            if coding == "identity" or accepted.get(coding, wildcard) > 0
+        ]
+        coding = min(candidates, key=lambda coding: len(self.variants[coding]))
+        return coding, self.variants[coding]
+
+
+class PayloadStore:
+    """Preserialized, precompressed bodies of hot responses, kept for the current dataset version only."""
+
+    def __init__(self):
+        self.version: Optional[str] = None
+        self.payloads: Dict[str, Payload] = {}
+
+    def get(self, key: str, version: str) -> Optional[Payload]:
+        return self.payloads.get(key) if version == self.version else None
+
+    def put(self, key: str, version: str, payload: Payload):
+        if version != self.version:
+            self.version = version
+            self.payloads = {}
+        self.payloads[key] = payload
@@ -0,0 +1,109 @@
+from typing import Iterable, List, Optional, Tuple
+import os
+import numpy as np
+from .similarity import EmbeddingIndex
+
+NEIGHBOURS_FORMAT_VERSION = 1
+
+
+class NeighbourTable:
+    """Precomputed top-k neighbours and scores of a set of entities, served as a keyed lookup.
+
+    Row i holds the neighbours of entities[i] as indices into candidates (the ids of the embeddings the
+    table was built from), best first, with -1 padding when fewer than k neighbours exist.
+    """
+
+    def __init__(
+        self,
+        entities: np.ndarray,
+        candidates: np.ndarray,
+        neighbours: np.ndarray,
+        scores: np.ndarray,
+        fingerprint: str,
+    ):
+        self.entities = entities
+        self.candidates = candidates
+        self.neighbours = neighbours
+        self.scores = scores
+        self.fingerprint = fingerprint
+        self.rows = {str(entity): row for row, entity in enumerate(entities)}
+
+    @property
+    def k(self) -> int:
+        return self.neighbours.shape[1]
+
+    def __len__(self) -> int:
+        return len(self.entities)
+
+    @classmethod
+    def build(cls, index: EmbeddingIndex, entities: Iterable[str], k: int = 50) -> "NeighbourTable":
+        """Computes the exact top-k neighbours of every given entity that has an embedding."""
+        entities = [entity for entity in entities if entity in index]
+        query_rows = np.array([index.rows[entity] for entity in entities], dtype=np.int64)
+        k = max(0, min(k, len(index) - 1))
+        neighbours = np.full((len(entities), k), -1, dtype=np.int32)
+        scores = np.zeros((len(entities), k), dtype=np.float32)
+
+        # Bound the size of the (batch x index) score matrix to about 128 MB.
+        batch_size = max(1, min(1024, (1 << 25) // max(1, len(index))))
+        for start in range(0, len(entities) if k else 0, batch_size):
+            rows = query_rows[start:start + batch_size]
+            batch_scores = index.matrix[rows] @ index.matrix.T
+            batch_scores[np.arange(len(rows)), rows] = -np.inf
+            if k < batch_scores.shape[1]:
+                best = np.argpartition(-batch_scores, k - 1, axis=1)[:, :k]
+            else:
+                best = np.tile(np.arange(batch_scores.shape[1]), (len(rows), 1))
+            best_scores = np.take_along_axis(batch_scores, best, axis=1)
+            order = np.argsort(-best_scores, axis=1, kind="stable")
+            neighbours[start:start + len(rows)] = np.take_along_axis(best, order, axis=1)
+            scores[start:start + len(rows)] = np.take_along_axis(best_scores, order, axis=1)
+
+        return cls(
+            np.array(entities, dtype=str),
+            np.array(list(index.ids), dtype=str),
+            neighbours,
+            scores,
+            index.fingerprint(),
+        )
+
+    def lookup(self, entity: str, k: int = 15, min_score: Optional[float] = None) -> Optional[List[Tuple[str, float]]]:
+        """Returns the stored top-k of an entity, or None if the table cannot answer (unknown entity or k too large)."""
+        row = self.rows.get(entity)
+        if row is None or k > self.k:
+            return None
+        neighbours = self.neighbours[row, :k]
+        scores = self.scores[row, :k]
+        keep = neighbours >= 0
+        if min_score is not None:
+            keep &= scores >= min_score
+        return [(str(self.candidates[n]), float(score)) for n, score in zip(neighbours[keep], scores[keep])]
+
+    def save(self, path: str):
+        """Writes the table under a temporary name and moves it into place, so readers never see a partial file."""
+        with open(f"{path}.tmp", "wb") as f:
+            np.savez(
+                f,
+                format_version=NEIGHBOURS_FORMAT_VERSION,
+                fingerprint=self.fingerprint,
+                entities=self.entities,
+                candidates=self.candidates,
+                neighbours=self.neighbours,
+                scores=self.scores,
+            )
+        os.replace(f"{path}.tmp", path)
+
+    @classmethod
+    def load(cls, path: str, fingerprint: Optional[str] = None) -> Optional["NeighbourTable"]:
+        """Loads a saved table, or returns None if it is missing or was built from other embeddings."""
+        try:
+            with np.load(path) as data:
+                if int(data["format_version"]) != NEIGHBOURS_FORMAT_VERSION:
+                    return None
+                if fingerprint is not None and str(data["fingerprint"]) != fingerprint:
+                    return None
+                return cls(
+                    data["entities"], data["candidates"], data["neighbours"], data["scores"], str(data["fingerprint"])
+                )
+        except FileNotFoundError:
+            return None
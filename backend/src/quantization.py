@@ -0,0 +1,108 @@
+from typing import List, Optional, Tuple
+import os
+import numpy as np
+from .similarity import EmbeddingIndex, top_k
+
+QUANTIZED_FORMAT_VERSION = 1
+QUANTIZED_DTYPES = ("float16", "int8")
+
+
+def quantize(matrix: np.ndarray, dtype: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Returns the quantized matrix and, for int8, the per-row scales that map codes back to floats."""
+    if dtype == "float16":
+        return matrix.astype(np.float16), None
+    if dtype == "int8":
+        scales = np.abs(matrix).max(axis=1).astype(np.float32) / 127
+        scales[scales == 0] = 1.0
+        codes = np.rint(matrix / scales[:, None]).astype(np.int8)
+        return codes, scales
+    raise ValueError(f"Unsupported quantization {dtype!r}, expected one of {QUANTIZED_DTYPES}.")
+
+
+class QuantizedIndex:
+    """Cosine similarity search over a float16 or int8 copy of an EmbeddingIndex.
+
+    Scores are computed on the quantized matrix in bounded-size chunks; with rerank > 1 the best k * rerank
+    candidates are rescored against the full-precision rows, which stay memory-mapped and are only read for
+    those candidates.
+    """
+
+    def __init__(self, index: EmbeddingIndex, codes: np.ndarray, scales: Optional[np.ndarray], rerank: int = 4):
+        self.index = index
+        self.codes = codes
+        self.scales = scales
+        self.rerank = rerank
+
+    @property
+    def dtype(self) -> str:
+        return self.codes.dtype.name
+
+    @classmethod
+    def build(cls, index: EmbeddingIndex, dtype: str = "int8", rerank: int = 4) -> "QuantizedIndex":
+        codes, scales = quantize(np.asarray(index.matrix), dtype)
+        return cls(index, codes, scales, rerank)
+
+    def memory_bytes(self) -> int:
+        return self.codes.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def scores(self, vector: np.ndarray, chunk_size: int = 1024) -> np.ndarray:
+        """Approximate cosine similarity of the query vector with every row, upcasting small cache-sized chunks."""
+        vector = np.asarray(vector, dtype=np.float32)
+        scores = np.empty(len(self.codes), dtype=np.float32)
+        for start in range(0, len(self.codes), chunk_size):
+            scores[start:start + chunk_size] = self.codes[start:start + chunk_size].astype(np.float32) @ vector
+        if self.scales is not None:
+            scores *= self.scales
+        return scores
+
+    def search_vector(
+        self, vector: np.ndarray, k: int = 15, min_score: Optional[float] = None, exclude: Optional[int] = None
+    ) -> List[Tuple[str, float]]:
+        """Returns up to k (id, cosine similarity) pairs for a unit-length query vector, best first."""
+        vector = np.asarray(vector, dtype=np.float32)
+        scores = self.scores(vector)
+        if exclude is not None:
+            scores[exclude] = -np.inf
+        rows = top_k(scores, k * self.rerank if self.rerank > 1 else k)
+        rows = rows[np.isfinite(scores[rows])]
+        if self.rerank > 1 and len(rows):
+            # Ascending row order reads the memory-mapped full-precision matrix sequentially.
+            rows = np.sort(rows)
+            scores[rows] = self.index.matrix[rows] @ vector
+            rows = rows[np.argsort(-scores[rows], kind="stable")][:k]
+        if min_score is not None:
+            rows = rows[scores[rows] >= min_score]
+        return [(self.index.ids[row], float(scores[row])) for row in rows]
+
+    def search(self, entity: str, k: int = 15, min_score: Optional[float] = None) -> Optional[List[Tuple[str, float]]]:
+        """Returns the k entities most similar to the given one, or None if it has no embedding."""
+        row = self.index.rows.get(entity)
+        if row is None:
+            return None
+        return self.search_vector(self.index.matrix[row], k, min_score, exclude=row)
+
+    def save(self, path: str):
+        """Writes the index under a temporary name and moves it into place, so readers never see a partial file."""
+        with open(f"{path}.tmp", "wb") as f:
+            np.savez(
+                f,
+                format_version=QUANTIZED_FORMAT_VERSION,
+                fingerprint=self.index.fingerprint(),
+                codes=self.codes,
+                scales=self.scales if self.scales is not None else np.empty(0, dtype=np.float32),
+            )
+        os.replace(f"{path}.tmp", path)
+
+    @classmethod
+    def load(cls, path: str, index: EmbeddingIndex, rerank: int = 4) -> Optional["QuantizedIndex"]:
+        """Loads a saved index, or returns None if it is missing or was built from other embeddings."""
+        try:
+            with np.load(path) as data:
+                if int(data["format_version"]) != QUANTIZED_FORMAT_VERSION:
+                    return None
+                if str(data["fingerprint"]) != index.fingerprint():
+                    return None
+                scales = data["scales"] if data["codes"].dtype == np.int8 else None
+                return cls(index, data["codes"], scales, rerank)
+        except FileNotFoundError:
+            return None
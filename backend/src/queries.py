@@ -49,6 +49,82 @@ def create_esolang_name_query(esolang_name: str | None) -> str:
     return query
 
 
+# Predicates returned by the esolang detail query, mapped to the field they fill and whether they are multi-valued.
+ESOLANG_DETAIL_PROPERTIES = {
+    "url": ("url", False),
+    "yearCreated": ("yearCreated", False),
+    "shortDescription": ("shortDescription", False),
+    "alias": ("alias", False),
+    "designedBy": ("designedBy", False),
+    "hasDimension": ("dimensions", True),
+    "hasMemorySystem": ("memorySystem", True),
+    "hasParadigm": ("paradigms", True),
+    "hasCategory": ("categories", True),
+    "influencedBy": ("influencedBy", True),
+    "influenced": ("influenced", True),
+    "fileExtension": ("fileExtensions", True),
+    "hasComputationalClass": ("computationalClasses", True),
+    "hasTypeSystem": ("typeSystems", True),
+    "hasDialect": ("dialects", True),
+}
+
+
+def create_esolang_details_query(esolang_name: str) -> str:
+    """Builds a query returning one (esolang, property, value) row per stored triple of the given esolang.
+
+    The subject IRI is bound directly instead of being matched with a filter, and every property comes back
+    as its own rows, so the result grows with the number of triples rather than with their product.
+    The name must already be URI-encoded.
+    """
+    return create_esolangs_details_query([esolang_name])
+
+
+def create_esolangs_details_query(esolang_names: List[str]) -> str:
+    """Same as create_esolang_details_query, for several (URI-encoded) esolang names in one query."""
+    subjects = " ".join(f"<{BASE_URI}{name}>" for name in esolang_names)
+    properties = " ".join(f"esolang:{name}" for name in ESOLANG_DETAIL_PROPERTIES)
+    query = (
+        PREFIXES
+        + f"""
+      SELECT ?esolang ?property ?value
+      WHERE {{
+        VALUES ?esolang {{ {subjects} }}
+        ?esolang rdf:type esolang:EsotericLanguage .
+        FILTER EXISTS {{ ?esolang esolang:url ?url . }}
+        VALUES ?property {{ {properties} }}
+        ?esolang ?property ?value .
+      }}
+      """
+    )
+
+    return query
+
+
+def create_all_esolangs_details_query() -> str:
+    """Returns the (esolang, property, value) rows of every esolang, to build the in-process catalogue."""
+    properties = " ".join(f"esolang:{name}" for name in ESOLANG_DETAIL_PROPERTIES)
+    query = (
+        PREFIXES
+        + f"""
+      SELECT ?esolang ?property ?value
+      WHERE {{
+        ?esolang rdf:type esolang:EsotericLanguage .
+        VALUES ?property {{ {properties} }}
+        ?esolang ?property ?value .
+      }}
+      """
+    )
+
+    return query
+
+
+def escape_string_literal(value: str) -> str:
+    """Escapes a value for use inside a quoted SPARQL string literal."""
+    for char, escaped in (("\\", "\\\\"), ('"', '\\"'), ("'", "\\'"), ("\n", "\\n"), ("\r", "\\r")):
+        value = value.replace(char, escaped)
+    return value
+
+
 def create_filter_query_parts(property_name: str, property_path: str, values: List[str]) -> str:
     query_parts = []
     if values:
@@ -78,7 +154,7 @@ def create_esolang_search_query(
     ]
 
     if search_term:
-        query_parts.append(f"FILTER(CONTAINS(LCASE(STR(?esolang)), LCASE('{search_term}')))")
+        query_parts.append(f"FILTER(CONTAINS(LCASE(STR(?esolang)), LCASE('{escape_string_literal(search_term)}')))")
 
     if paradigm:
         query_parts.extend(create_filter_query_parts("hasParadigm", "paradigm", paradigm))
@@ -112,6 +188,8 @@ def create_esolang_search_query(
         query_parts.append(f"VALUES ?yearCreated {{{years_values}}}")
 
     query_parts.append("}")
+    # A stable order, so LIMIT/OFFSET pages do not overlap or skip esolangs.
+    query_parts.append("ORDER BY ?esolang")
 
     if limit is not None:
         query_parts.append(f"LIMIT {limit}")
@@ -264,6 +342,42 @@ def create_file_extensions_query() -> str:
 
     return query
 
+# Facets served by /api/facets, mapped to their predicate and the IRI path of their values (None for literals).
+FACET_PROPERTIES = {
+    "paradigm": ("hasParadigm", "paradigm"),
+    "category": ("hasCategory", "category"),
+    "memorySystem": ("hasMemorySystem", "memory-system"),
+    "dimension": ("hasDimension", "dimension"),
+    "computationalClass": ("hasComputationalClass", "computational-class"),
+    "typeSystem": ("hasTypeSystem", "type-system"),
+    "dialect": ("hasDialect", "dialect"),
+    "fileExtension": ("fileExtension", None),
+    "yearCreated": ("yearCreated", None),
+}
+
+
+def create_all_facets_query() -> str:
+    """Builds one query returning a (facet, value) row per distinct value of every facet in FACET_PROPERTIES."""
+    branches = []
+    for facet, (predicate, path) in FACET_PROPERTIES.items():
+        value = f'STRAFTER(STR(?v), "{BASE_URI}{path}/")' if path else "STR(?v)"
+        branches.append(f'{{ ?esolang esolang:{predicate} ?v . BIND("{facet}" AS ?facet) BIND({value} AS ?value) }}')
+    union = "\n          UNION ".join(branches)
+    query = (
+        PREFIXES
+        + f"""
+        SELECT DISTINCT ?facet ?value
+        WHERE {{
+          ?esolang rdf:type esolang:EsotericLanguage .
+          {union}
+        }}
+        ORDER BY ?facet ?value
+        """
+    )
+
+    return query
+
+
 def create_all_triples_query() -> str:
     query = (
         PREFIXES
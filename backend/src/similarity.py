@@ -0,0 +1,90 @@
+from typing import Dict, List, Optional, Tuple
+import hashlib
+import numpy as np
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Returns a float32 copy of the matrix with every row scaled to unit length (zero rows stay zero)."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return np.ascontiguousarray(matrix / norms, dtype=np.float32)
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Returns the indices of the k highest scores, best first."""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < len(scores):
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+class EmbeddingIndex:
+    """Exact cosine similarity search over one contiguous matrix of L2-normalized entity embeddings.
+
+    Row i of the matrix is the embedding of ids[i]; since rows are unit length, a query is a single
+    matrix-vector product followed by a partial sort.
+    """
+
+    def __init__(self, ids: List[str], matrix: np.ndarray, normalized: bool = False, metadata: Optional[Dict] = None):
+        if len(ids) != len(matrix):
+            raise ValueError("Every embedding row needs exactly one id.")
+        self.ids = np.asarray(ids, dtype=object)
+        self.matrix = matrix if normalized else normalize_rows(matrix)
+        self.metadata = metadata or {}
+        self.rows = {entity: row for row, entity in enumerate(ids)}
+        self._fingerprint = None
+
+    @classmethod
+    def from_embeddings(cls, embeddings: Dict[str, np.ndarray]) -> "EmbeddingIndex":
+        ids = list(embeddings)
+        matrix = np.stack([embeddings[entity] for entity in ids]) if ids else np.empty((0, 0), dtype=np.float32)
+        return cls(ids, matrix)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, entity: str) -> bool:
+        return entity in self.rows
+
+    def fingerprint(self) -> str:
+        """Identifies these embeddings, so files derived from other embeddings can be detected as stale."""
+        if self._fingerprint is not None:
+            return self._fingerprint
+        digest = hashlib.sha256()
+        digest.update(str(self.matrix.shape).encode())
+        for entity in self.ids:
+            digest.update(entity.encode())
+            digest.update(b"\0")
+        digest.update(np.ascontiguousarray(self.matrix[:: max(1, len(self) // 64)]).tobytes())
+        self._fingerprint = digest.hexdigest()[:16]
+        return self._fingerprint
+
+    def vector(self, entity: str) -> Optional[np.ndarray]:
+        row = self.rows.get(entity)
+        return None if row is None else self.matrix[row]
+
+    def search_vector(
+        self, vector: np.ndarray, k: int = 15, min_score: Optional[float] = None, exclude: Optional[int] = None
+    ) -> List[Tuple[str, float]]:
+        """Returns up to k (id, cosine similarity) pairs for a unit-length query vector, best first."""
+        scores = self.matrix @ np.asarray(vector, dtype=np.float32)
+        if exclude is not None:
+            scores[exclude] = -np.inf
+        rows = top_k(scores, k)
+        if min_score is not None:
+            rows = rows[scores[rows] >= min_score]
+        elif exclude is not None:
+            rows = rows[rows != exclude]
+        return [(self.ids[row], float(scores[row])) for row in rows]
+
+    def search(self, entity: str, k: int = 15, min_score: Optional[float] = None) -> Optional[List[Tuple[str, float]]]:
+        """Returns the k entities most similar to the given one, or None if it has no embedding."""
+        row = self.rows.get(entity)
+        if row is None:
+            return None
+        return self.search_vector(self.matrix[row], k, min_score, exclude=row)
@@ -0,0 +1,36 @@
+from typing import Any, Awaitable, Callable, Dict, Hashable
+import asyncio
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into a single execution.
+
+    The first caller starts the work as its own task; callers arriving while it is still running
+    await the same task and receive the same result (or exception). Cancelling one caller does not
+    cancel the shared work for the others.
+    """
+
+    def __init__(self):
+        self.coalesced = 0
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled():
+            # Mark the exception as retrieved in case every caller was cancelled before the task finished.
+            task.exception()
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._in_flight)
@@ -0,0 +1,216 @@
+from typing import Dict, List, Optional, Tuple
+from bisect import bisect_left
+import heapq
+import html
+import math
+import re
+import urllib.parse
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"[^\W_]+")
+# Indexed text fields and their weight in the ranking.
+TEXT_FIELDS = {"name": 3.0, "alias": 2.0, "designedBy": 1.5, "shortDescription": 1.0}
+# Weight of a query token matching a whole indexed term, the start of a term, or anywhere inside a term.
+EXACT_MATCH, PREFIX_MATCH, INFIX_MATCH = 1.0, 0.6, 0.3
+# Shortest query token matched against the start of longer terms (shorter ones only match whole terms), and the
+# shortest matched inside terms.
+MIN_PREFIX_LENGTH, MIN_INFIX_LENGTH = 2, 3
+# Most terms a query token expands to by prefix, and by infix; the terms in the most documents are kept, so the
+# work per token is bounded whatever the size of the vocabulary.
+MAX_EXPANSIONS = 50
+BM25_K1, BM25_B = 1.2, 0.75
+SNIPPET_CONTEXT = 60
+
+
+def tokenize(text: str) -> List[str]:
+    return [match.group().lower() for match in TOKEN_PATTERN.finditer(text or "")]
+
+
+def trigrams(term: str) -> set:
+    return {term[i:i + 3] for i in range(len(term) - 2)}
+
+
+def esolang_name_text(name: str) -> str:
+    """The display form of an (URI-encoded) esolang name."""
+    return urllib.parse.unquote(name).replace("_", " ")
+
+
+def field_text(esolang: Dict, field: str) -> str:
+    if field == "name":
+        return esolang_name_text(esolang["name"])
+    return esolang.get(field) or ""
+
+
+class TextIndex:
+    """Inverted index over the name, alias, designer and short description of every esolang.
+
+    Each term's postings hold the documents it occurs in with a precomputed BM25 score (summed over the
+    weighted fields), so a query only touches the postings of the terms it matches. Query tokens are
+    expanded to the indexed terms they equal, start or occur in: prefixes through the sorted vocabulary,
+    infixes through a trigram index over the vocabulary. A document must match every query token.
+
+    Prefixes matching more than MAX_EXPANSIONS terms have their most frequent terms precomputed, and the
+    trigram lists are ordered by document frequency, so every token expands to a bounded number of terms
+    and scoring is a few numpy operations over their postings.
+    """
+
+    def __init__(self, esolangs: List[Dict]):
+        self.esolangs = esolangs
+        n_fields = len(TEXT_FIELDS)
+        lengths = np.zeros((len(esolangs), n_fields), dtype=np.float32)
+        frequencies: Dict[str, Dict[int, np.ndarray]] = {}
+        for doc, esolang in enumerate(esolangs):
+            for f, field in enumerate(TEXT_FIELDS):
+                tokens = tokenize(field_text(esolang, field))
+                lengths[doc, f] = len(tokens)
+                for token in tokens:
+                    counts = frequencies.setdefault(token, {}).setdefault(doc, np.zeros(n_fields, dtype=np.float32))
+                    counts[f] += 1
+
+        average_lengths = np.maximum(lengths.mean(axis=0), 1.0) if len(esolangs) else np.ones(n_fields)
+        weights = np.array(list(TEXT_FIELDS.values()), dtype=np.float32)
+        self.postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        for term, docs in frequencies.items():
+            idf = math.log(1 + (len(esolangs) - len(docs) + 0.5) / (len(docs) + 0.5))
+            doc_ids = np.fromiter(docs, dtype=np.int32, count=len(docs))
+            tf = np.stack(list(docs.values()))
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[doc_ids] / average_lengths)
+            scores = idf * (tf * (BM25_K1 + 1) / (tf + norm) * weights).sum(axis=1)
+            self.postings[term] = (doc_ids, scores.astype(np.float32))
+
+        names = [esolang["name"] for esolang in esolangs]
+        self.name_ranks = np.empty(len(esolangs), dtype=np.int64)
+        self.name_ranks[sorted(range(len(esolangs)), key=names.__getitem__)] = np.arange(len(esolangs))
+
+        self.vocabulary = sorted(self.postings)
+        by_frequency = sorted(self.vocabulary, key=lambda term: (-len(self.postings[term][0]), term))
+        self.trigram_terms: Dict[str, List[str]] = {}
+        for term in by_frequency:
+            for trigram in trigrams(term):
+                self.trigram_terms.setdefault(trigram, []).append(term)
+        self.trigram_sets = {trigram: set(terms) for trigram, terms in self.trigram_terms.items()}
+
+        self.top_prefix_terms: Dict[str, List[str]] = {}
+        for term in self.vocabulary:
+            for length in range(MIN_PREFIX_LENGTH, len(term) + 1):
+                prefix = term[:length]
+                if prefix in self.top_prefix_terms:
+                    continue
+                start, end = self.prefix_range(prefix)
+                if end - start <= MAX_EXPANSIONS:
+                    break
+                self.top_prefix_terms[prefix] = heapq.nlargest(
+                    MAX_EXPANSIONS, self.vocabulary[start:end], key=lambda term: len(self.postings[term][0])
+                )
+
+    def __len__(self) -> int:
+        return len(self.esolangs)
+
+    def prefix_range(self, prefix: str) -> Tuple[int, int]:
+        start = bisect_left(self.vocabulary, prefix)
+        return start, bisect_left(self.vocabulary, prefix + "\U0010ffff", start)
+
+    def expand(self, token: str) -> Dict[str, float]:
+        """Maps a query token to the indexed terms it matches and the weight of each match."""
+        matches = {token: EXACT_MATCH} if token in self.postings else {}
+        if len(token) >= MIN_PREFIX_LENGTH:
+            terms = self.top_prefix_terms.get(token)
+            if terms is None:
+                start, end = self.prefix_range(token)
+                terms = self.vocabulary[start:end]
+            for term in terms:
+                matches.setdefault(term, PREFIX_MATCH)
+        if len(token) >= MIN_INFIX_LENGTH:
+            lists = sorted((self.trigram_terms.get(trigram, []) for trigram in trigrams(token)), key=len)
+            others = [self.trigram_sets.get(trigram, set()) for trigram in trigrams(token)]
+            infixes = 0
+            # The shortest list, in document frequency order, so the most frequent matching terms come first.
+            for term in lists[0]:
+                if term not in matches and token in term and all(term in terms for terms in others):
+                    matches[term] = INFIX_MATCH
+                    infixes += 1
+                    if infixes == MAX_EXPANSIONS:
+                        break
+        return matches
+
+    def token_scores(self, token: str) -> Tuple[np.ndarray, np.ndarray]:
+        """The documents matching a token, in id order, with the best weighted score among the terms it matches."""
+        expansions = self.expand(token)
+        if not expansions:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float64)
+        docs = np.concatenate([self.postings[term][0] for term in expansions])
+        scores = np.concatenate([self.postings[term][1] * weight for term, weight in expansions.items()])
+        unique, inverse = np.unique(docs, return_inverse=True)
+        best = np.zeros(len(unique), dtype=np.float64)
+        np.maximum.at(best, inverse, scores)
+        return unique, best
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[Tuple[int, float]]:
+        """Returns (document, score) pairs of the documents matching every query token, best first."""
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return []
+
+        docs, totals = self.token_scores(tokens[0])
+        for token in tokens[1:]:
+            if not len(docs):
+                break
+            token_docs, token_best = self.token_scores(token)
+            docs, left, right = np.intersect1d(docs, token_docs, assume_unique=True, return_indices=True)
+            totals = totals[left] + token_best[right]
+        if not len(docs):
+            return []
+
+        order = np.lexsort((self.name_ranks[docs], -totals))
+        if limit is not None:
+            order = order[:limit]
+        return [(int(docs[i]), float(totals[i])) for i in order]
+
+    def highlight(self, doc: int, query: str) -> Dict[str, str]:
+        """Returns the fields of a document that match the query, HTML-escaped with matches in <mark> tags.
+
+        Long fields are cut to a snippet around their first match.
+        """
+        tokens = sorted(set(tokenize(query)), key=len, reverse=True)
+        highlights = {}
+        for field in TEXT_FIELDS:
+            text = field_text(self.esolangs[doc], field)
+            spans = []
+            for match in TOKEN_PATTERN.finditer(text):
+                term = match.group().lower()
+                for token in tokens:
+                    offset = match_offset(term, token)
+                    if offset >= 0:
+                        spans.append((match.start() + offset, match.start() + offset + len(token)))
+                        break
+            if spans:
+                highlights[field] = mark_spans(text, spans, field == "shortDescription")
+        return highlights
+
+
+def match_offset(term: str, token: str) -> int:
+    """Where a query token matches a term under the rules of TextIndex.expand, or -1: whole terms only below
+    MIN_PREFIX_LENGTH, term starts only below MIN_INFIX_LENGTH."""
+    if term == token or (len(token) >= MIN_PREFIX_LENGTH and term.startswith(token)):
+        return 0
+    if len(token) >= MIN_INFIX_LENGTH:
+        return term.find(token)
+    return -1
+
+
+def mark_spans(text: str, spans: List[Tuple[int, int]], snippet: bool = False) -> str:
+    start, end = 0, len(text)
+    if snippet:
+        start = max(0, spans[0][0] - SNIPPET_CONTEXT)
+        end = min(len(text), spans[0][1] + 2 * SNIPPET_CONTEXT)
+    parts = ["…" if start > 0 else ""]
+    position = start
+    for span_start, span_end in spans:
+        if span_start < position or span_end > end:
+            continue
+        parts.append(html.escape(text[position:span_start]))
+        parts.append(f"<mark>{html.escape(text[span_start:span_end])}</mark>")
+        position = span_end
+    parts.append(html.escape(text[position:end]))
+    parts.append("…" if end < len(text) else "")
+    return "".join(parts)
@@ -1,7 +1,25 @@
-from typing import List, Dict
-import pickle
-from sentence_transformers import SentenceTransformer
+from typing import Callable, List, Dict, Optional, Tuple
+import hashlib
+import logging
 import numpy as np
+from scipy import sparse
+from .queries import BASE_URI, ESOLANG_DETAIL_PROPERTIES
+from .similarity import EmbeddingIndex
+from .encoding import encode_texts, load_encoder
+from .embedding_store import save_embedding_store, load_embedding_store, StaleEmbeddingStoreError
+
+# Prefix of the embedding store files (.npy matrix and .ids.json index).
+EMBEDDINGS_PATH = "src/entity_embeddings"
+# Content-addressed cache of per-triple sentence embeddings, reused across rebuilds.
+TRIPLE_CACHE_PATH = "src/triple_embeddings"
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+# Number of triples encoded between two progress reports (and handed to the encode pool at once).
+ENCODE_CHUNK_SIZE = 4096
+IVF_INDEX_PATH = "src/entity_embeddings.ivf.npz"
+NEIGHBOURS_PATH = "src/entity_neighbours.npz"
+QUANTIZED_INDEX_PATH = "src/entity_embeddings.{dtype}.npz"
+EMBEDDINGS_LOCK_PATH = "src/entity_embeddings.lock"
+RDF_TYPE = "http://www.w3.org/1999/02/22-rdf-syntax-ns#type"
 
 def get_esolang_from_query_result(esolang_name: str, result: List[Dict] ) -> Dict:
     print("Result: ", type(result))
@@ -70,38 +88,236 @@ def get_esolang_from_query_result(esolang_name: str, result: List[Dict] ) -> Dic
     return esolang
 
 
-def compute_embeddings(triples_result: List[Dict]) -> Dict:
-    try:
-        triples = [
-            " ".join([binding["s"]["value"], binding["p"]["value"], binding["o"]["value"]])
-            for binding in triples_result
-        ]
-        entities = list(set(binding["s"]["value"] for binding in triples_result))
-
-        model = SentenceTransformer("all-MiniLM-L6-v2")
-        embeddings = model.encode(triples)
-        entity_embeddings = {}
-
-        for entity in entities:
-            entity_triples = [
-                embedding
-                for triple, embedding in zip(triples, embeddings)
-                if entity in triple
-            ]
-            if entity_triples:
-                entity_embeddings[entity] = np.mean(entity_triples, axis=0)
-
-        with open("src/entity_embeddings.pkl", "wb") as f:
-            pickle.dump(entity_embeddings, f)
-
-        return entity_embeddings
-    except Exception as e:
-        raise e
-
-
-def load_embeddings():
+def get_esolang_from_property_rows(esolang_name: str, rows: List[Dict]) -> Dict:
+    """Reshapes the rows of create_esolang_details_query into an esolang dictionary in a single pass."""
+    esolang = {"name": esolang_name}
+    for field, multi_valued in ESOLANG_DETAIL_PROPERTIES.values():
+        esolang[field] = {} if multi_valued else None
+
+    for row in rows:
+        prop = row["property"]["value"][len(BASE_URI):]
+        field, multi_valued = ESOLANG_DETAIL_PROPERTIES[prop]
+        value = row["value"]["value"]
+        if multi_valued:
+            # A dict keeps first-seen order while dropping duplicates.
+            esolang[field][value] = None
+        elif esolang[field] is None:
+            esolang[field] = value
+
+    for field, multi_valued in ESOLANG_DETAIL_PROPERTIES.values():
+        if multi_valued:
+            esolang[field] = list(esolang[field])
+
+    return esolang
+
+
+def group_rows_by_esolang(rows: List[Dict]) -> Dict[str, List[Dict]]:
+    """Groups detail query rows by the IRI of the esolang they describe."""
+    grouped = {}
+    for row in rows:
+        grouped.setdefault(row["esolang"]["value"], []).append(row)
+    return grouped
+
+
+def get_esolang_iris(triples_result: List[Dict]) -> List[str]:
+    """Returns the IRIs typed as EsotericLanguage in the result of create_all_triples_query."""
+    esolang_class = f"{BASE_URI}EsotericLanguage"
+    return [
+        binding["s"]["value"]
+        for binding in triples_result
+        if binding["p"]["value"] == RDF_TYPE and binding["o"]["value"] == esolang_class
+    ]
+
+
+def triple_text(binding: Dict) -> str:
+    return " ".join([binding["s"]["value"], binding["p"]["value"], binding["o"]["value"]])
+
+
+def triple_hash(text: str) -> str:
+    """Content address of a triple text in the triple embedding cache."""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def entity_membership(triples_result: List[Dict], include_objects: bool = True) -> Tuple[List[str], sparse.csr_matrix]:
+    """Maps every entity to the triples it takes part in, in time linear in the number of triples.
+
+    Every subject of a triple is an entity. A triple counts towards its subject and, with include_objects,
+    towards its object when that object is itself an entity. Returns the entity IRIs and a sparse
+    (entities x triples) membership matrix with rows in matching order.
+    """
+    entity_rows = {}
+    subject_rows = np.fromiter(
+        (entity_rows.setdefault(binding["s"]["value"], len(entity_rows)) for binding in triples_result),
+        dtype=np.int64,
+        count=len(triples_result),
+    )
+    triple_ids = np.arange(len(triples_result))
+    rows, columns = [subject_rows], [triple_ids]
+
+    if include_objects:
+        object_rows = np.fromiter(
+            (
+                entity_rows.get(binding["o"]["value"], -1) if binding["o"]["type"] == "uri" else -1
+                for binding in triples_result
+            ),
+            dtype=np.int64,
+            count=len(triples_result),
+        )
+        linked = (object_rows >= 0) & (object_rows != subject_rows)
+        rows.append(object_rows[linked])
+        columns.append(triple_ids[linked])
+
+    rows = np.concatenate(rows)
+    membership = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.float32), (rows, np.concatenate(columns))),
+        shape=(len(entity_rows), len(triples_result)),
+    )
+    return list(entity_rows), membership
+
+
+def mean_embeddings(membership: sparse.csr_matrix, embeddings: np.ndarray) -> np.ndarray:
+    """Averages the triple embeddings of every membership row with one sparse-dense product."""
+    counts = np.asarray(membership.sum(axis=1), dtype=np.float32)
+    return np.asarray(membership @ embeddings, dtype=np.float32) / counts
+
+
+def aggregate_entity_embeddings(
+    triples_result: List[Dict], embeddings: np.ndarray, include_objects: bool = True
+) -> Tuple[List[str], np.ndarray]:
+    """Returns the entity IRIs and the mean embedding of the triples each one takes part in."""
+    entities, membership = entity_membership(triples_result, include_objects)
+    return entities, mean_embeddings(membership, embeddings)
+
+
+def entity_digests(membership: sparse.csr_matrix, hashes: List[str]) -> List[str]:
+    """Order-independent digest of the set of triples behind every entity, used to skip unchanged entities."""
+    hash_values = np.array([int(h[:16], 16) for h in hashes], dtype=np.uint64)
+    digests = np.zeros(membership.shape[0], dtype=np.uint64)
+    non_empty = np.diff(membership.indptr) > 0
+    # Sums wrap around modulo 2**64, which keeps the digest independent of triple order.
+    digests[non_empty] = np.add.reduceat(hash_values[membership.indices], membership.indptr[:-1][non_empty])
+    return [f"{digest:016x}" for digest in digests]
+
+
+def embedding_model_tag(encoder: str = "torch", onnx_quantized: bool = False) -> str:
+    """Identifies the encoder that produced stored embeddings; vectors with different tags are never mixed."""
+    if encoder == "torch":
+        return EMBEDDING_MODEL
+    return f"{EMBEDDING_MODEL}:{encoder}{'-int8' if onnx_quantized else ''}"
+
+
+def load_triple_cache(model_tag: str = EMBEDDING_MODEL) -> Optional[EmbeddingIndex]:
+    """Opens the cached triple embeddings if they were produced by the given encoder (see embedding_model_tag)."""
     try:
-        with open("src/entity_embeddings.pkl", "rb") as f:
-            return pickle.load(f)
-    except FileNotFoundError:
+        cache = load_embedding_store(TRIPLE_CACHE_PATH)
+    except StaleEmbeddingStoreError as e:
+        logging.warning(f"Ignoring stale triple embedding cache: {e}")
         return None
+    if cache is None or cache.metadata.get("model") != model_tag:
+        return None
+    return cache
+
+
+def compute_embeddings(
+    triples_result: List[Dict],
+    progress: Optional[Callable[[str, float], None]] = None,
+    batch_size: int = 64,
+    processes: int = 1,
+    encoder: str = "torch",
+    onnx_model_dir: Optional[str] = None,
+    onnx_quantized: bool = False,
+) -> Tuple[EmbeddingIndex, Dict]:
+    """Embeds every triple, averages the embeddings per entity and saves them to the embedding store.
+
+    Triple embeddings are cached by a hash of the triple text, so only new or changed triples are encoded,
+    and entities whose set of triples is unchanged keep their previous embedding instead of being
+    re-aggregated. Returns the new index and counts of reused and recomputed work. The optional progress
+    callback receives the current stage and the completed fraction of the build; batch_size and processes
+    tune the encoder (see encode_texts), and encoder selects sentence-transformers ("torch") or the exported
+    ONNX model in onnx_model_dir ("onnx"). Cached vectors are only reused if the same encoder (and ONNX
+    quantization) produced them. Raises ValueError when there are no triples.
+    """
+    if progress is None:
+        progress = lambda stage, fraction: None
+    if not triples_result:
+        raise ValueError("No triples to embed: the dataset is empty.")
+    progress("hashing triples", 0.0)
+    triples = [triple_text(binding) for binding in triples_result]
+    hashes = [triple_hash(triple) for triple in triples]
+
+    model_tag = embedding_model_tag(encoder, onnx_quantized)
+    cache = load_triple_cache(model_tag)
+    cached_rows = np.array([cache.rows.get(h, -1) if cache is not None else -1 for h in hashes], dtype=np.int64)
+    reused = cached_rows >= 0
+    missing = np.flatnonzero(~reused)
+    # Repeated triple texts are encoded once and their embedding copied to every occurrence.
+    unique_missing = list({hashes[i]: i for i in missing}.values())
+
+    encoded, encode_stats = None, {}
+    if len(missing):
+        progress("encoding triples", 0.05)
+        encoded, encode_stats = encode_texts(
+            load_encoder(encoder, EMBEDDING_MODEL, onnx_model_dir, onnx_quantized),
+            [triples[i] for i in unique_missing],
+            batch_size,
+            processes,
+            ENCODE_CHUNK_SIZE,
+            lambda fraction: progress("encoding triples", 0.05 + 0.8 * fraction),
+        )
+    dimension = encoded.shape[1] if encoded is not None else cache.matrix.shape[1]
+
+    embeddings = np.empty((len(triples), dimension), dtype=np.float32)
+    if reused.any():
+        embeddings[reused] = cache.matrix[cached_rows[reused]]
+    if encoded is not None:
+        encoded_rows = {hashes[i]: row for row, i in enumerate(unique_missing)}
+        embeddings[missing] = encoded[[encoded_rows[hashes[i]] for i in missing]]
+
+    unique_rows = list({h: row for row, h in enumerate(hashes)}.values())
+    save_embedding_store(
+        TRIPLE_CACHE_PATH,
+        [hashes[row] for row in unique_rows],
+        embeddings[unique_rows],
+        {"model": model_tag},
+        normalize=False,
+    )
+
+    progress("aggregating entities", 0.85)
+    entities, membership = entity_membership(triples_result)
+    digests = entity_digests(membership, hashes)
+    try:
+        previous = load_embeddings()
+    except StaleEmbeddingStoreError:
+        previous = None
+    previous_digests = {}
+    if previous is not None and previous.metadata.get("model") == model_tag:
+        previous_digests = dict(zip(previous.ids, previous.metadata.get("digests", [])))
+
+    changed = np.array([previous_digests.get(entity) != digest for entity, digest in zip(entities, digests)], dtype=bool)
+    means = np.empty((len(entities), dimension), dtype=np.float32)
+    if (~changed).any():
+        means[~changed] = previous.matrix[[previous.rows[entities[row]] for row in np.flatnonzero(~changed)]]
+    if changed.any():
+        means[changed] = mean_embeddings(membership[changed], embeddings)
+
+    stats = {
+        "triples": len(triples),
+        "reusedTriples": int(reused.sum()),
+        "encodedTriples": len(unique_missing),
+        "entities": len(entities),
+        "reaggregatedEntities": int(changed.sum()),
+        **encode_stats,
+    }
+    logging.info(
+        f"Embeddings rebuilt: {stats['reusedTriples']} triples reused, {stats['encodedTriples']} encoded, "
+        f"{stats['reaggregatedEntities']} of {stats['entities']} entities re-aggregated"
+    )
+
+    progress("saving embeddings", 0.95)
+    index = save_embedding_store(EMBEDDINGS_PATH, entities, means, {"model": model_tag, "digests": digests})
+    return index, stats
+
+
+def load_embeddings() -> Optional[EmbeddingIndex]:
+    """Opens the stored entity embeddings memory-mapped, or returns None if they have not been computed yet."""
+    return load_embedding_store(EMBEDDINGS_PATH)
@@ -0,0 +1,131 @@
+import pytest
+from src.guarded_query import guard_select_query, RejectedQueryError
+from src.SPARQLClient import normalize_query
+
+MAX_ROWS = 1000
+
+
+@pytest.mark.parametrize("query", [
+    "SELECT * WHERE { SERVICE <http://127.0.0.1:18765/sparql> { ?s ?p ?o } }",
+    "select * where { service <http://127.0.0.1/sparql> { ?s ?p ?o } }",
+    "SELECT * FROM <http://example.org/graph> WHERE { ?s ?p ?o }",
+    "SELECT * FROM NAMED <http://example.org/graph> WHERE { GRAPH ?g { ?s ?p ?o } }",
+])
+def test_remote_access_is_rejected(query):
+    with pytest.raises(RejectedQueryError):
+        guard_select_query(query, MAX_ROWS)
+
+
+@pytest.mark.parametrize("query", [
+    "INSERT DATA { <a> <b> <c> }",
+    "PREFIX ex: <http://example.org/> DELETE WHERE { ?s ex:p ?o }",
+    "DELETE { ?s ?p ?o } INSERT { ?s ?p 1 } WHERE { ?s ?p ?o }",
+    "WITH <http://example.org/g> DELETE { ?s ?p ?o } WHERE { ?s ?p ?o }",
+    "LOAD <http://example.org/data.ttl>",
+    "CLEAR ALL",
+    "DROP GRAPH <http://example.org/g>",
+    "CREATE GRAPH <http://example.org/g>",
+    "SELECT * WHERE { ?s ?p ?o } ; INSERT DATA { <a> <b> <c> }",
+])
+def test_updates_are_rejected(query):
+    with pytest.raises(RejectedQueryError):
+        guard_select_query(query, MAX_ROWS)
+
+
+@pytest.mark.parametrize("query", [
+    "ASK { ?s ?p ?o }",
+    "CONSTRUCT { ?s ?p ?o } WHERE { ?s ?p ?o }",
+    "DESCRIBE <http://example.org/x>",
+])
+def test_other_query_forms_are_rejected(query):
+    with pytest.raises(RejectedQueryError):
+        guard_select_query(query, MAX_ROWS)
+
+
+@pytest.mark.parametrize("query", [
+    "SELECT ?s WHERE { ?s ?p 'DROP ALL; SERVICE <x> {}' }",
+    'SELECT ?s WHERE { ?s ?p """INSERT DATA\nFROM""" }',
+    "SELECT ?s WHERE { ?s <http://example.org/delete#service> ?o }",
+    "SELECT ?s WHERE { ?s ?p ?o } # INSERT DATA { <a> <b> <c> } FROM <x>",
+    "# SERVICE <http://127.0.0.1/>\nSELECT ?s WHERE { ?s ?p ?o }",
+])
+def test_keywords_inside_literals_iris_and_comments_are_allowed(query):
+    assert guard_select_query(query, MAX_ROWS).startswith(query.rstrip())
+
+
+@pytest.mark.parametrize("query", [
+    "SELECT ?from ?service WHERE { ?from ?p ?service }",
+    "PREFIX : <http://example.org/> SELECT ?s WHERE { ?s :with ?o . ?s :delete $insert }",
+    "PREFIX from: <http://example.org/> SELECT ?s WHERE { ?s from:p ?o }",
+])
+def test_variables_and_prefixed_names_named_like_keywords_are_allowed(query):
+    assert guard_select_query(query, MAX_ROWS) == f"{query}\nLIMIT {MAX_ROWS + 1}"
+
+
+def test_missing_limit_is_added():
+    assert guard_select_query("SELECT ?s WHERE { ?s ?p ?o }", MAX_ROWS) == "SELECT ?s WHERE { ?s ?p ?o }\nLIMIT 1001"
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("SELECT ?s WHERE { ?s ?p ?o } LIMIT 5000", "SELECT ?s WHERE { ?s ?p ?o } LIMIT 1001"),
+    ("SELECT ?s WHERE { ?s ?p ?o } limit 5000 OFFSET 10", "SELECT ?s WHERE { ?s ?p ?o } limit 1001 OFFSET 10"),
+    ("SELECT ?s WHERE { ?s ?p ?o } OFFSET 10 LIMIT 1001", "SELECT ?s WHERE { ?s ?p ?o } OFFSET 10 LIMIT 1001"),
+])
+def test_limit_above_the_cap_is_rewritten(query, expected):
+    assert guard_select_query(query, MAX_ROWS) == expected
+
+
+@pytest.mark.parametrize("query", [
+    "SELECT ?s WHERE { ?s ?p ?o } LIMIT 1000",
+    "SELECT ?s WHERE { ?s ?p ?o } LIMIT 5 OFFSET 20",
+])
+def test_limit_within_the_cap_is_kept(query):
+    assert guard_select_query(query, MAX_ROWS) == query
+
+
+def test_limit_of_a_subquery_is_not_the_outer_limit():
+    query = "SELECT * WHERE { { SELECT ?s WHERE { ?s ?p ?o } LIMIT 5 } }"
+    assert guard_select_query(query, MAX_ROWS) == f"{query}\nLIMIT 1001"
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("SELECT ?s WHERE { ?s ?p ?o } LIMIT 5 # hi", "SELECT ?s WHERE { ?s ?p ?o } LIMIT 5 # hi"),
+    ("SELECT ?s WHERE { ?s ?p ?o } LIMIT 5000 # hi\n", "SELECT ?s WHERE { ?s ?p ?o } LIMIT 1001 # hi\n"),
+    ("SELECT ?s WHERE { ?s ?p ?o } # LIMIT 5", "SELECT ?s WHERE { ?s ?p ?o } # LIMIT 5\nLIMIT 1001"),
+])
+def test_trailing_comment_gets_no_second_limit(query, expected):
+    assert guard_select_query(query, MAX_ROWS) == expected
+
+
+@pytest.mark.parametrize("query, expected", [
+    (
+        "SELECT * WHERE {?s ?p ?o} VALUES ?s {<http://x>}",
+        "SELECT * WHERE {?s ?p ?o}\nLIMIT 1001\nVALUES ?s {<http://x>}",
+    ),
+    (
+        "SELECT * WHERE {?s ?p ?o} LIMIT 5000 VALUES (?s ?p) {(<a> <b>) (UNDEF <c>)}",
+        "SELECT * WHERE {?s ?p ?o} LIMIT 1001 \nVALUES (?s ?p) {(<a> <b>) (UNDEF <c>)}",
+    ),
+    (
+        "SELECT * WHERE {?s ?p ?o} LIMIT 5 VALUES ?s {<http://x>}",
+        "SELECT * WHERE {?s ?p ?o} LIMIT 5 VALUES ?s {<http://x>}",
+    ),
+    (
+        "SELECT * WHERE { ?s ?p ?o VALUES ?s { <http://x> } }",
+        "SELECT * WHERE { ?s ?p ?o VALUES ?s { <http://x> } }\nLIMIT 1001",
+    ),
+])
+def test_trailing_values_block_stays_last(query, expected):
+    assert guard_select_query(query, MAX_ROWS) == expected
+
+
+def test_normalize_query_keeps_text_after_a_comment_apart():
+    filtered = "SELECT ?s WHERE {\n?s ?p ?o # a\nFILTER(false)\n}"
+    commented_out = "SELECT ?s WHERE {\n?s ?p ?o # a FILTER(false)\n}"
+    assert normalize_query(filtered) != normalize_query(commented_out)
+    assert normalize_query(filtered) == "SELECT ?s WHERE { ?s ?p ?o FILTER(false) }"
+
+
+def test_normalize_query_keeps_literals_and_iris_intact():
+    query = 'SELECT * { ?s <http://x#a> "x  # y" ; ?p """a\n  b""" }  # end'
+    assert normalize_query(query) == 'SELECT * { ?s <http://x#a> "x  # y" ; ?p """a\n  b""" }'